@@ -1,5 +1,5 @@
-import time, statistics
-import problem
+import statistics
+from runner import build_jobs, run_jobs, group_results, print_row
 import matplotlib.pyplot as plt
 
 from ant_colony       import run_ant_colony
@@ -16,7 +16,8 @@ experiments = [
             'num_iterations': 500,
             'evaporation':    0.9,
             'alpha':          1.0,
-            'beta':           1.0
+            'beta':           1.0,
+            'heuristic':      True
         }
     },
     {
@@ -27,7 +28,8 @@ experiments = [
             'num_iterations': 500,
             'evaporation': 0.9,
             'alpha': 1.0,
-            'beta': 2.0
+            'beta': 2.0,
+            'heuristic': True
         }
     },
     {
@@ -38,7 +40,8 @@ experiments = [
             'num_iterations': 500,
             'evaporation': 0.9,
             'alpha': 1.0,
-            'beta': 3.0
+            'beta': 3.0,
+            'heuristic': True
         }
     },
     {
@@ -49,7 +52,8 @@ experiments = [
             'num_iterations': 500,
             'evaporation':    0.9,
             'alpha':          2.0,
-            'beta':           1.0
+            'beta':           1.0,
+            'heuristic':      True
         }
     },
     {
@@ -60,7 +64,8 @@ experiments = [
             'num_iterations': 500,
             'evaporation': 0.9,
             'alpha': 2.0,
-            'beta': 2.0
+            'beta': 2.0,
+            'heuristic': True
         }
     },
     {
@@ -71,7 +76,8 @@ experiments = [
             'num_iterations': 500,
             'evaporation': 0.9,
             'alpha': 2.0,
-            'beta': 3.0
+            'beta': 3.0,
+            'heuristic': True
         }
     },
     {
@@ -82,7 +88,8 @@ experiments = [
             'num_iterations': 500,
             'evaporation':    0.9,
             'alpha':          3.0,
-            'beta':           1.0
+            'beta':           1.0,
+            'heuristic':      True
         }
     },
     {
@@ -93,7 +100,8 @@ experiments = [
             'num_iterations': 500,
             'evaporation': 0.9,
             'alpha': 3.0,
-            'beta': 2.0
+            'beta': 2.0,
+            'heuristic': True
         }
     },
     {
@@ -104,7 +112,8 @@ experiments = [
             'num_iterations': 500,
             'evaporation': 0.9,
             'alpha': 3.0,
-            'beta': 3.0
+            'beta': 3.0,
+            'heuristic': True
         }
     },
 ]
@@ -116,82 +125,69 @@ problem_sizes = [
     ("Large", 50,30),
 ]
 
-for size_label, nurses, days in problem_sizes:
-    problem.NUM_NURSES = nurses
-    problem.NUM_DAYS   = days
+def main():
+    rows    = run_jobs(build_jobs(experiments, problem_sizes, NUM_RUNS), on_row=print_row)
+    grouped = group_results(rows)
 
-    print(f"\n===== {size_label} ({nurses}×{days}) =====")
+    for size_label, nurses, days in problem_sizes:
+        print(f"\n===== {size_label} ({nurses}×{days}) =====")
 
-    # prepare storage
-    results = {exp['label']: {'scores':[], 'times':[]} for exp in experiments}
+        results = grouped[size_label]
 
-    for run in range(1, NUM_RUNS+1):
-        print(f"\n--- Run {run} ---")
-        for exp in experiments:
-            label = exp['label']
-            func  = exp['func']
-            args  = exp['args']
+        # summary
+        print("\n--- Summary ---")
+        for label, data in results.items():
+            sc, tm = data['scores'], data['times']
+            print(f"{label:10} | "
+                  f"Score → mean={statistics.mean(sc):.2f}, std={statistics.pstdev(sc):.2f}, "
+                  f"min={min(sc)}, max={max(sc)} | "
+                  f"Time  → mean={statistics.mean(tm):.2f}s, std={statistics.pstdev(tm):.2f}s, "
+                  f"min={min(tm)}s, max={max(tm)}s")
 
-            t0 = time.time()
-            schedule = func(**args)
-            score    = problem.evaluate(schedule)
-            elapsed  = round(time.time() - t0, 2)
+        # --------------- plotting ----------------
+        labels = list(results.keys())
+        mean_scores = [statistics.mean(results[lbl]['scores']) for lbl in labels]
+        mean_times  = [statistics.mean(results[lbl]['times'])  for lbl in labels]
+        x = list(range(len(labels)))
 
-            results[label]['scores'].append(score)
-            results[label]['times'].append(elapsed)
+        import numpy as np
+        # Mean Score plot
+        plt.figure()
+        colors = plt.cm.tab10(np.linspace(0, 1, len(labels)))
+        bars = plt.bar(x, mean_scores, color=colors)
+        for bar, value in zip(bars, mean_scores):
+            height = bar.get_height()
+            plt.text(bar.get_x() + bar.get_width() / 2,
+                     height + 0.01 * max(mean_scores),
+                     f'{value:.2f}',
+                     ha='center',
+                     va='bottom',
+                     fontsize=9)
+        plt.xticks(x, labels, rotation=45)
+        plt.ylabel('Mean Penalty Score')
+        plt.title(f'{size_label} Mean Score')
+        plt.tight_layout()
+        plt.savefig(f'{size_label}_mean_score_ACOalfabeta.png')
+        plt.close()
 
-            print(f"{label:10} → Score: {score:6} | Time: {elapsed:6}s")
+        # Mean Time plot
+        plt.figure()
+        bars = plt.bar(x, mean_times, color=colors)
+        for bar, value in zip(bars, mean_times):
+            height = bar.get_height()
+            plt.text(bar.get_x() + bar.get_width() / 2,
+                     height + 0.01 * max(mean_times),
+                     f'{value:.4f}',
+                     ha='center',
+                     va='bottom',
+                     fontsize=9)
+        plt.xticks(x, labels, rotation=45)
+        plt.ylabel('Mean Runtime (s)')
+        plt.title(f'{size_label} Mean Time')
+        plt.tight_layout()
+        plt.savefig(f'{size_label}_mean_time_ACOalfabeta.png')
+        plt.close()
 
-    # summary
-    print("\n--- Summary ---")
-    for label, data in results.items():
-        sc, tm = data['scores'], data['times']
-        print(f"{label:10} | "
-              f"Score → mean={statistics.mean(sc):.2f}, std={statistics.pstdev(sc):.2f}, "
-              f"min={min(sc)}, max={max(sc)} | "
-              f"Time  → mean={statistics.mean(tm):.2f}s, std={statistics.pstdev(tm):.2f}s, "
-              f"min={min(tm)}s, max={max(tm)}s")
 
-    # --------------- plotting ----------------
-    labels = list(results.keys())
-    mean_scores = [statistics.mean(results[lbl]['scores']) for lbl in labels]
-    mean_times  = [statistics.mean(results[lbl]['times'])  for lbl in labels]
-    x = list(range(len(labels)))
-
-    import numpy as np
-    # Mean Score plot
-    plt.figure()
-    colors = plt.cm.tab10(np.linspace(0, 1, len(labels)))
-    bars = plt.bar(x, mean_scores, color=colors)
-    for bar, value in zip(bars, mean_scores):
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2,
-                 height + 0.01 * max(mean_scores),
-                 f'{value:.2f}',
-                 ha='center',
-                 va='bottom',
-                 fontsize=9)
-    plt.xticks(x, labels, rotation=45)
-    plt.ylabel('Mean Penalty Score')
-    plt.title(f'{size_label} Mean Score')
-    plt.tight_layout()
-    plt.savefig(f'{size_label}_mean_score_ACOalfabeta.png')
-    plt.close()
-
-    # Mean Time plot
-    plt.figure()
-    bars = plt.bar(x, mean_times, color=colors)
-    for bar, value in zip(bars, mean_times):
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width() / 2,
-                 height + 0.01 * max(mean_times),
-                 f'{value:.4f}',
-                 ha='center',
-                 va='bottom',
-                 fontsize=9)
-    plt.xticks(x, labels, rotation=45)
-    plt.ylabel('Mean Runtime (s)')
-    plt.title(f'{size_label} Mean Time')
-    plt.tight_layout()
-    plt.savefig(f'{size_label}_mean_time_ACOalfabeta.png')
-    plt.close()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,478 @@
 # ant_colony.py
 
+import multiprocessing as mp
+import os
 import random
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
 import problem
+from stopping import StopCriteria
+
+# eta factor for a shift the nurse may not take after yesterday's shift (night -> morning)
+FORBIDDEN_ETA = 0.1
 
 def run_ant_colony(
     *,
-    num_ants       = 40,
-    num_iterations = 500,
-    evaporation    = 0.9,
-    alpha          = 1.0,
-    beta           = 2.0,
-    seed           = None
+    instance         = None,
+    num_ants         = 40,
+    num_iterations   = 500,
+    evaporation      = 0.9,
+    alpha            = 1.0,
+    beta             = 2.0,
+    heuristic        = True,
+    mmas             = False,
+    deposit          = None,
+    tau_min          = None,
+    tau_max          = None,
+    p_best           = 0.05,
+    restart_entropy  = 0.05,
+    workers          = 1,
+    time_budget      = None,
+    target_score     = None,
+    stall_iterations = None,
+    info             = None,
+    trace            = None,
+    initial          = None,
+    seed             = None
 ):
     """
-    Returns a best_schedule (list[list[int]]).
+    Returns a best_schedule (problem.Schedule).
     Added: seed for reproducibility.
+    `initial` (Schedule or list rows) starts as the best-so-far and is reinforced first.
+    `instance` is the ProblemInstance to solve (defaults to the problem module globals).
+    heuristic=True builds schedules day by day with a coverage/rest-aware eta (weighted
+    by beta); heuristic=False samples from the pheromones alone (eta = 1).
+    mmas=True runs a Max-Min Ant System: pheromones start at tau_max and are clamped to
+    [tau_min, tau_max] (derived from the best score and p_best unless given), and are
+    reset to tau_max whenever the mean branching entropy above the converged floor drops
+    below `restart_entropy`; `info` then also gets the number of 'restarts'. `deposit`
+    picks the reinforced schedule: 'iteration' (MMAS default) or 'global' (default otherwise).
+    workers > 1 splits each iteration's ants into that many shares: this process builds
+    one and persistent worker processes build the others from the pheromone matrix in
+    shared memory, sending back only their best ant (results depend on the worker count).
+    Every share pays the full day-by-day loop of the heuristic construction, so this only
+    pays off on idle cores with colonies of hundreds of ants; keep the default of 1 otherwise.
+    Stops after num_iterations (None = no cap), or earlier on time_budget (seconds),
+    target_score or stall_iterations; `info` receives the StopCriteria report. Without
+    `initial` the first iteration always runs, so even a spent budget returns a schedule.
+    A tracing.Trace passed as `trace` samples (iteration, iteration best, best,
+    evaluations) every trace.every iterations and times the 'construction',
+    'evaluation' and 'evaporation' (evaporation, deposit, MMAS bounds) phases; with
+    workers > 1 construction includes the scoring done in the workers.
+    """
+    instance = instance or problem.current_instance()
+    if trace is not None:
+        trace.begin()
+    stop = StopCriteria(num_iterations, time_budget=time_budget, target_score=target_score,
+                        stall_iterations=stall_iterations)
+    colony = _new_colony(instance, seed, initial)
+    params = dict(num_ants=num_ants, evaporation=evaporation, alpha=alpha, beta=beta,
+                  heuristic=heuristic, mmas=mmas, deposit=deposit, tau_min=tau_min,
+                  tau_max=tau_max, p_best=p_best, restart_entropy=restart_entropy)
+
+    if workers <= 1:
+        _run_iterations(colony, stop, trace=trace, **params)
+        if info is not None:
+            info.update(stop.report())
+            if mmas:
+                info['restarts'] = colony['restarts']
+        return colony['best_schedule']
+
+    # pheromones live in shared memory so the builders read them without copies
+    shape = colony['pheromones'].shape
+    shm = shared_memory.SharedMemory(create=True, size=colony['pheromones'].nbytes)
+    shares = _split(num_ants, workers)
+    builders = []
+    try:
+        colony['pheromones'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        colony['pheromones'].fill(1.0)
+        builders = [_WorkerProcess(_builder_process, instance, shm.name, shape, share, alpha, beta,
+                                   heuristic) for share in shares[1:]]
+        _run_iterations(colony, stop, builders=builders, shares=shares, trace=trace, **params)
+        best_schedule = colony['best_schedule']
+    finally:
+        for builder in builders:
+            builder.close()
+        colony['pheromones'] = None
+        shm.close()
+        shm.unlink()
+    if info is not None:
+        info.update(stop.report())
+        if mmas:
+            info['restarts'] = colony['restarts']
+    return best_schedule
+
+
+def run_multi_colony(
+    *,
+    instance         = None,
+    num_colonies     = 4,
+    exchange_every   = 25,
+    num_ants         = 40,
+    num_iterations   = 500,
+    evaporation      = 0.9,
+    alpha            = 1.0,
+    beta             = 2.0,
+    heuristic        = True,
+    mmas             = False,
+    deposit          = None,
+    tau_min          = None,
+    tau_max          = None,
+    p_best           = 0.05,
+    restart_entropy  = 0.05,
+    workers          = None,
+    time_budget      = None,
+    target_score     = None,
+    stall_iterations = None,
+    info             = None,
+    trace            = None,
+    seed             = None
+):
+    """
+    Island ACO: `num_colonies` independent colonies evolve in persistent hosts, dealt
+    round-robin to `workers` of them (default one per colony, capped at the CPU count):
+    one in this process, the others worker processes that run concurrently with it.
+    Every `exchange_every` iterations each colony receives the best schedule of its
+    ring neighbour and adopts it as its best-so-far if it beats its own best. Only
+    deposit='global' reinforces the adopted schedule; with iteration-best deposit (the
+    MMAS default) it just raises the colony's pheromone bounds and best score.
+    Only those best schedules cross process boundaries; pheromones stay in their host.
+    Colony options and stopping criteria are the same as for run_ant_colony; the
+    criteria are checked between exchanges, and each epoch also ends inside the
+    hosts once the remaining time budget or the target score is reached (the first
+    epoch always runs one iteration per colony, so a schedule is returned). With mmas,
+    `info` also gets the 'restarts' summed over the colonies.
+    Returns the best schedule over all colonies (problem.Schedule).
+    A `trace` is sampled after every exchange (current = best over the colonies) and
+    times the 'epoch' and 'exchange' phases.
     """
-    if seed is not None:
-        random.seed(seed)
-
-    # grab the up-to-date problem dimensions
-    n_nurses = problem.NUM_NURSES
-    n_days   = problem.NUM_DAYS
-    shifts   = problem.SHIFTS
-    evaluate = problem.evaluate
-
-    # initialize pheromones
-    pheromones = {
-        (n, d, s): 1.0
-        for n in range(n_nurses)
-        for d in range(n_days)
-        for s in shifts
+    instance = instance or problem.current_instance()
+    if trace is not None:
+        t = trace.begin()
+    stop = StopCriteria(num_iterations, time_budget=time_budget, target_score=target_score,
+                        stall_iterations=stall_iterations)
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(64) for _ in range(num_colonies)]
+    params = dict(num_ants=num_ants, evaporation=evaporation, alpha=alpha, beta=beta,
+                  heuristic=heuristic, mmas=mmas, deposit=deposit, tau_min=tau_min,
+                  tau_max=tau_max, p_best=p_best, restart_entropy=restart_entropy)
+
+    # colonies are dealt round-robin to the hosts; one host runs in this process
+    workers = max(1, min(workers or os.cpu_count() or 1, num_colonies))
+    groups = [list(range(w, num_colonies, workers)) for w in range(workers)]
+    hosts = [_LocalColonies(instance, [seeds[i] for i in groups[0]], params)]
+    hosts += [_WorkerProcess(_colony_process, instance, [seeds[i] for i in group], params)
+              for group in groups[1:]]
+    try:
+        bests = [(float('inf'), None)] * num_colonies
+        restarts = [0] * num_colonies
+        arrivals = [None] * num_colonies
+        done = 0
+        while not done or not stop.should_stop(done, min(score for score, _ in bests)):
+            span = exchange_every if num_iterations is None else min(exchange_every, num_iterations - done)
+            limits = dict(time_budget=stop.remaining(), target_score=target_score)
+            # worker hosts first: the local host's send() runs its colonies synchronously
+            for host, group in reversed(list(zip(hosts, groups))):
+                host.send((span, limits, [arrivals[i] for i in group]))
+
+            epoch = 0
+            for host, group in zip(hosts, groups):
+                for i, (score, iterations, schedule, colony_restarts) in zip(group, host.receive()):
+                    bests[i] = (score, schedule)
+                    restarts[i] = colony_restarts
+                    epoch = max(epoch, iterations)
+            done += epoch
+            if trace is not None:
+                t = trace.lap('epoch', t)
+
+            # ring migration of the best schedules, adopted by the hosts next epoch
+            arrivals = [bests[i - 1] for i in range(num_colonies)]
+            if trace is not None:
+                t = trace.lap('exchange', t)
+                best_score = min(score for score, _ in bests)
+                trace.record(done, best_score, best_score, done * num_ants * num_colonies)
+    finally:
+        for host in hosts:
+            host.close()
+
+    if info is not None:
+        info.update(stop.report())
+        if mmas:
+            info['restarts'] = sum(restarts)
+    return min(bests, key=lambda best: best[0])[1]
+
+
+def _new_colony(instance, seed, initial=None):
+    """Per-colony state: pheromones (nurses, days, shifts), numpy RNG and best-so-far."""
+    colony = {
+        'instance':      instance,
+        'rng':           np.random.default_rng(seed),
+        'pheromones':    np.ones((instance.num_nurses, instance.num_days, len(instance.shifts))),
+        'best_schedule': None,
+        'best_score':    float('inf'),
+        'restarts':      0,
     }
+    if initial is not None:
+        colony['best_schedule'] = problem.Schedule.from_lists(initial)
+        colony['best_score']    = instance.evaluate(colony['best_schedule'])
+    return colony
+
 
-    best_schedule = None
-    best_score    = float('inf')
-
-    for _ in range(num_iterations):
-        # each ant builds a schedule
-        for _ in range(num_ants):
-            schedule = [[None] * n_days for _ in range(n_nurses)]
-            for d in range(n_days):
-                for n in range(n_nurses):
-                    weights = []
-                    for s in shifts:
-                        tau = pheromones[(n, d, s)] ** alpha
-                        eta = 1.0
-                        weights.append((s, tau * (eta ** beta)))
-
-                    total = sum(w for _, w in weights)
-                    if total <= 0:
-                        # fallback uniform choice if weights degenerate
-                        schedule[n][d] = random.choice(shifts)
-                        continue
-
-                    r   = random.random() * total
-                    cum = 0.0
-                    for s, w in weights:
-                        cum += w
-                        if r <= cum:
-                            schedule[n][d] = s
-                            break
-                    if schedule[n][d] is None:
-                        schedule[n][d] = shifts[-1]
-
-            score = evaluate(schedule)
-            if score < best_score:
-                best_score    = score
-                best_schedule = [row[:] for row in schedule]
+def _run_iterations(colony, stop, *, num_ants, evaporation, alpha, beta, heuristic,
+                    mmas=False, deposit=None, tau_min=None, tau_max=None, p_best=0.05,
+                    restart_entropy=0.05, builders=None, shares=None, trace=None):
+    instance   = colony['instance']
+    pheromones = colony['pheromones']
+    rng        = colony['rng']
+    deposit    = deposit or ('iteration' if mmas else 'global')
+    nurses     = np.arange(instance.num_nurses)[:, None]
+    days       = np.arange(instance.num_days)[None, :]
+
+    k = 0
+    # a colony without a best schedule yet builds one before the criteria apply
+    while colony['best_schedule'] is None or not stop.should_stop(k, colony['best_score']):
+        # each ant builds a schedule (locally, or share by share with the builders)
+        if builders is None:
+            score, schedule = _build_colony(instance, pheromones, num_ants, alpha, beta, heuristic, rng,
+                                            trace)
+        else:
+            if trace is not None:
+                t = time.perf_counter()
+            seeds = rng.integers(2**63, size=len(shares)).tolist()
+            for builder, share_seed in zip(builders, seeds[1:]):
+                builder.send(share_seed)
+            results = [_build_colony(instance, pheromones, shares[0], alpha, beta, heuristic,
+                                     np.random.default_rng(seeds[0]))]
+            results += [builder.receive() for builder in builders]
+            score, schedule = min(results, key=lambda r: r[0])
+            if trace is not None:
+                trace.lap('construction', t)
+        if trace is not None:
+            t = time.perf_counter()
+
+        if score < colony['best_score']:
+            colony['best_score']    = score
+            colony['best_schedule'] = schedule
+
+        if mmas:
+            low, high = _mmas_bounds(colony['best_score'], pheromones.shape, evaporation,
+                                     p_best, tau_min, tau_max)
+            if not colony.get('mmas_started'):
+                # MMAS starts from the upper bound once the first best score is known
+                pheromones.fill(high)
+                colony['mmas_started'] = True
 
         # evaporate pheromones
-        for key in pheromones:
-            pheromones[key] *= evaporation
+        pheromones *= evaporation
 
-        # reinforce the global best (safe-guard)
-        if best_schedule is not None:
-            for n in range(n_nurses):
-                for d, s in enumerate(best_schedule[n]):
-                    pheromones[(n, d, s)] += 1.0 / (1.0 + best_score)
+        # reinforce the iteration best or the global best (safe-guard)
+        if deposit == 'iteration':
+            source, source_score = schedule, score
+        else:
+            source, source_score = colony['best_schedule'], colony['best_score']
+        if source is not None:
+            pheromones[nurses, days, np.asarray(source)] += 1.0 / (1.0 + source_score)
 
-    return best_schedule
+        if mmas:
+            np.clip(pheromones, low, high, out=pheromones)
+            if _excess_entropy(pheromones, alpha, low, high) < restart_entropy:
+                pheromones.fill(high)
+                colony['restarts'] += 1
+
+        if trace is not None:
+            trace.lap('evaporation', t)
+            if k % trace.every == 0:
+                trace.record(k, score, colony['best_score'], (k + 1) * num_ants)
+        k += 1
+
+    colony['epoch_iterations'] = k
+    return colony
+
+
+def _mmas_bounds(best_score, shape, evaporation, p_best, tau_min=None, tau_max=None):
+    """
+    Standard MMAS bounds: tau_max = deposit / rho for the best score, and tau_min from
+    the probability p_best of rebuilding the best solution once converged.
+    """
+    rho = max(1.0 - evaporation, 1e-12)
+    if tau_max is None:
+        tau_max = 1.0 / (rho * (1.0 + best_score))
+    if tau_min is None:
+        decisions = shape[0] * shape[1]
+        root = p_best ** (1.0 / decisions)
+        avg  = shape[2] / 2.0
+        tau_min = tau_max * (1.0 - root) / max((avg - 1.0) * root, 1e-12)
+    return min(tau_min, tau_max), tau_max
+
+
+def _excess_entropy(pheromones, alpha, tau_min, tau_max):
+    """
+    Mean per-cell choice entropy (normalized to [0, 1]) measured above the floor of a
+    fully converged cell (one shift at tau_max, the rest at tau_min).
+    """
+    n_shifts = pheromones.shape[2]
+    weights  = pheromones ** alpha
+    p = weights / weights.sum(axis=2, keepdims=True)
+    entropy = -(p * np.log(np.maximum(p, 1e-300))).sum(axis=2).mean() / np.log(n_shifts)
+
+    floor_w = np.array([tau_max] + [tau_min] * (n_shifts - 1)) ** alpha
+    floor_p = floor_w / floor_w.sum()
+    floor   = -(floor_p * np.log(np.maximum(floor_p, 1e-300))).sum() / np.log(n_shifts)
+    if floor >= 1.0:
+        return 1.0
+    return (entropy - floor) / (1.0 - floor)
+
+
+def _build_colony(instance, pheromones, num_ants, alpha, beta, heuristic, rng, trace=None):
+    """
+    Builds num_ants schedules at once from the pheromones (rng: numpy Generator)
+    and returns (score, Schedule) of the best one.
+    """
+    if trace is not None:
+        t = time.perf_counter()
+    tau = pheromones ** alpha
+    if heuristic:
+        colony = _construct_with_heuristic(instance, tau, num_ants, beta, rng)
+    else:
+        colony = _sample_from_pheromones(tau, num_ants, rng)
+    if trace is not None:
+        t = trace.lap('construction', t)
+
+    # score the whole colony at once; first best wins ties
+    scores = instance.evaluate_batch(colony)
+    if trace is not None:
+        trace.lap('evaluation', t)
+    best   = int(np.argmin(scores))
+    return int(scores[best]), problem.Schedule.from_array(colony[best])
+
+
+def _sample_from_pheromones(tau, num_ants, rng):
+    """eta = 1: every cell is independent, so all ants are sampled in one shot."""
+    # cumulative roulette per cell; fall back to uniform where weights degenerate
+    total = tau.sum(axis=2, keepdims=True)
+    weights = np.where(total > 0, tau, 1.0)
+    cum = np.cumsum(weights, axis=2)
+    cum /= cum[:, :, -1:]
+
+    # one uniform draw per (ant, nurse, day); the chosen shift is the first cum >= u
+    u = rng.random((num_ants, tau.shape[0], tau.shape[1], 1))
+    return (u > cum[None, :, :, :-1]).sum(axis=3, dtype=np.int8)
+
+
+def _construct_with_heuristic(instance, tau, num_ants, beta, rng):
+    """
+    Day-by-day construction, vectorized over ants. While an ant fills a day it tracks
+    how many nurses already cover each shift: eta = 1 + remaining coverage deficit,
+    times FORBIDDEN_ETA for a morning right after that nurse's night shift.
+    """
+    n_nurses, n_days, n_shifts = tau.shape
+    required = np.array(instance.min_coverage)
+    forbidden = np.array(instance.forbidden_next, dtype=bool)[:n_shifts, :n_shifts]
+
+    # eta ** beta lookups: by remaining deficit, and by (yesterday's shift, shift)
+    deficit_eta = (1.0 + np.arange(required.max() + 1)) ** beta
+    rest_eta    = np.where(forbidden, FORBIDDEN_ETA, 1.0) ** beta
+
+    # built as (days, nurses, ants) so each step reads and writes contiguous rows
+    built   = np.empty((n_days, n_nurses, num_ants), dtype=np.int8)
+    covered = np.empty((num_ants, n_shifts), dtype=np.int64)
+    one_hot = np.eye(n_shifts, dtype=np.int64)
+    u       = rng.random((n_days, n_nurses, num_ants, 1))
+
+    for d in range(n_days):
+        covered.fill(0)
+        for n in range(n_nurses):
+            weights = tau[n, d] * deficit_eta[np.maximum(required - covered, 0)]
+            if d > 0:
+                weights *= rest_eta[built[d - 1, n]]
+
+            cum = np.cumsum(weights, axis=1)
+            choice = (u[d, n] * cum[:, -1:] > cum[:, :-1]).sum(axis=1)
+            built[d, n] = choice
+            covered += one_hot[choice]
+    colony = np.ascontiguousarray(built.transpose(2, 1, 0))
+    return colony
+
+
+def _split(total, parts):
+    """Near-equal positive shares of `total` ants over at most `parts` workers."""
+    parts = max(1, min(parts, total))
+    return [total // parts + (i < total % parts) for i in range(parts)]
+
+
+# --- worker-process side -------------------------------------------------------
+
+class _WorkerProcess:
+    """A persistent process running target(conn, *args); messages travel over a pipe."""
+
+    def __init__(self, target, *args):
+        self.conn, child = mp.Pipe()
+        self.process = mp.Process(target=target, args=(child, *args), daemon=True)
+        self.process.start()
+        child.close()
+
+    def send(self, message):
+        self.conn.send(message)
+
+    def receive(self):
+        return self.conn.recv()
+
+    def close(self):
+        self.conn.send(None)
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class _LocalColonies:
+    """Colonies run in the calling process (same interface as _WorkerProcess)."""
+
+    def __init__(self, instance, seeds, params):
+        self.colonies = [_new_colony(instance, seed) for seed in seeds]
+        self.params = params
+        self.reply = None
+
+    def send(self, message):
+        self.reply = _serve_colonies(self.colonies, message, self.params)
+
+    def receive(self):
+        return self.reply
+
+    def close(self):
+        pass
+
+
+def _serve_colonies(colonies, message, params):
+    """
+    Answers one (iterations, limits, arrivals) epoch message for the colonies of a host:
+    each colony adopts its arrival (score, schedule) if that beats its best, runs up to
+    `iterations` iterations, and reports (best score, iterations done, best schedule,
+    pheromone restarts so far).
+    """
+    iterations, limits, arrivals = message
+    replies = []
+    for colony, arrival in zip(colonies, arrivals):
+        if arrival is not None and arrival[0] < colony['best_score']:
+            colony['best_score']    = arrival[0]
+            colony['best_schedule'] = arrival[1].copy()
+        _run_iterations(colony, StopCriteria(iterations, **limits), **params)
+        replies.append((colony['best_score'], colony['epoch_iterations'], colony['best_schedule'],
+                        colony['restarts']))
+    return replies
+
+
+def _colony_process(conn, instance, seeds, params):
+    colonies = [_new_colony(instance, seed) for seed in seeds]
+    for message in iter(conn.recv, None):
+        conn.send(_serve_colonies(colonies, message, params))
+
+
+def _builder_process(conn, instance, shm_name, shape, num_ants, alpha, beta, heuristic):
+    shm = shared_memory.SharedMemory(name=shm_name)  # mapped for the process lifetime
+    pheromones = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    for seed in iter(conn.recv, None):
+        conn.send(_build_colony(instance, pheromones, num_ants, alpha, beta, heuristic,
+                                np.random.default_rng(seed)))
@@ -0,0 +1,211 @@
+# benchmark.py
+
+import argparse, json, os, platform, random, sys, time
+
+import numpy as np
+
+from problem             import ProblemInstance, Schedule, random_move
+from simulated_annealing import tweak_schedule
+from tabu_search         import tweak_schedule_with_move_info
+from genetic             import crossover_uniform_nurse, mutate, evolve_population
+from ant_colony          import _build_colony
+from neighborhood        import DeltaTable
+
+BASELINE_JSON = "results/benchmark_baseline.json"
+
+# Roster sizes (nurses × days), smallest to largest
+problem_sizes = [
+    ("5x7",    5,   7),
+    ("30x20",  30,  20),
+    ("50x30",  50,  30),
+    ("100x60", 100, 60),
+    ("500x60", 500, 60),
+]
+
+BATCH = 64  # schedules per call for the population/colony kernels
+
+
+# Each kernel: setup(instance, rng) -> (callable, operations per call).
+# Throughput is reported as operations per second (schedules, moves or ants).
+
+def bench_evaluate(instance, rng):
+    schedule = Schedule.from_lists(instance.random_schedule(rng))
+    return (lambda: instance.evaluate(schedule)), 1
+
+def bench_evaluate_batch(instance, rng):
+    batch = rng_population(instance, rng, BATCH)
+    return (lambda: instance.evaluate_batch(batch)), BATCH
+
+def bench_delta_evaluate(instance, rng):
+    schedule = Schedule.from_lists(instance.random_schedule(rng))
+    counts = instance.coverage_counts(schedule)
+    moves = [random_move(schedule, rng, instance.shifts) for _ in range(256)]
+    def run():
+        for move in moves:
+            instance.delta_evaluate(schedule, move.nurse, move.day, move.new, counts)
+    return run, len(moves)
+
+def bench_random_schedule(instance, rng):
+    return (lambda: instance.random_schedule(rng)), 1
+
+def bench_tweak_schedule(instance, rng):
+    schedule = Schedule.from_lists(instance.random_schedule(rng))
+    return (lambda: tweak_schedule(schedule, rng, instance.shifts)), 1
+
+def bench_tweak_with_move_info(instance, rng):
+    schedule = Schedule.from_lists(instance.random_schedule(rng))
+    return (lambda: tweak_schedule_with_move_info(schedule, rng, instance.shifts)), 1
+
+def bench_crossover(instance, rng):
+    p1 = Schedule.from_lists(instance.random_schedule(rng))
+    p2 = Schedule.from_lists(instance.random_schedule(rng))
+    return (lambda: crossover_uniform_nurse(p1, p2, rng)), 1
+
+def bench_mutate(instance, rng):
+    schedule = Schedule.from_lists(instance.random_schedule(rng))
+    return (lambda: mutate(schedule, 0.02, rng, instance.shifts)), 1
+
+def bench_evolve_population(instance, rng):
+    np_rng = np.random.default_rng(0)
+    population = rng_population(instance, rng, BATCH)
+    scores = instance.evaluate_batch(population)
+    return (lambda: evolve_population(population, scores, np_rng, len(instance.shifts))), BATCH
+
+def bench_delta_table_apply(instance, rng):
+    schedule = Schedule.from_lists(instance.random_schedule(rng))
+    table = DeltaTable(instance, schedule)
+    moves = [random_move(schedule, rng, instance.shifts) for _ in range(64)]
+    def run():
+        for move in moves:
+            table.apply(move.nurse, move.day, move.new)
+    return run, len(moves)
+
+def bench_aco_construction(instance, rng):
+    np_rng = np.random.default_rng(0)
+    pheromones = np.ones((instance.num_nurses, instance.num_days, len(instance.shifts)))
+    return (lambda: _build_colony(instance, pheromones, BATCH, 1.0, 2.0, True, np_rng)), BATCH
+
+def bench_aco_sampling(instance, rng):
+    np_rng = np.random.default_rng(0)
+    pheromones = np.ones((instance.num_nurses, instance.num_days, len(instance.shifts)))
+    return (lambda: _build_colony(instance, pheromones, BATCH, 1.0, 2.0, False, np_rng)), BATCH
+
+def rng_population(instance, rng, size):
+    rows = [instance.random_schedule(rng) for _ in range(size)]
+    return np.asarray(rows, dtype=np.int8)
+
+KERNELS = {
+    "evaluate":                bench_evaluate,
+    "evaluate_batch":          bench_evaluate_batch,
+    "delta_evaluate":          bench_delta_evaluate,
+    "random_schedule":         bench_random_schedule,
+    "tweak_schedule":          bench_tweak_schedule,
+    "tweak_with_move_info":    bench_tweak_with_move_info,
+    "crossover_uniform_nurse": bench_crossover,
+    "mutate":                  bench_mutate,
+    "evolve_population":       bench_evolve_population,
+    "delta_table_apply":       bench_delta_table_apply,
+    "aco_construction":        bench_aco_construction,
+    "aco_sampling":            bench_aco_sampling,
+}
+
+
+def measure(func, ops_per_call, min_time=0.2, repeats=3):
+    """Best-of-`repeats` throughput (ops/s); each repeat runs for at least `min_time` seconds."""
+    best = 0.0
+    for _ in range(repeats):
+        calls = 0
+        t0 = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - t0
+            if elapsed >= min_time:
+                break
+        best = max(best, calls * ops_per_call / elapsed)
+    return best
+
+
+def run_benchmarks(kernels, sizes, min_time=0.2, repeats=3, on_result=None):
+    """-> {kernel: {size_label: ops/s}}"""
+    results = {}
+    for name in kernels:
+        for size_label, nurses, days in sizes:
+            instance = ProblemInstance(num_nurses=nurses, num_days=days)
+            func, ops = KERNELS[name](instance, random.Random(0))
+            rate = measure(func, ops, min_time, repeats)
+            results.setdefault(name, {})[size_label] = rate
+            if on_result is not None:
+                on_result(name, size_label, rate)
+    return results
+
+
+def compare(results, baseline):
+    """Rows (kernel, size, baseline ops/s, ops/s, ratio) for every measurement present in both."""
+    rows = []
+    for name, by_size in results.items():
+        for size_label, rate in by_size.items():
+            base = baseline.get(name, {}).get(size_label)
+            if base:
+                rows.append((name, size_label, base, rate, rate / base))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the solver hot paths (ops/s).")
+    parser.add_argument("--kernels", nargs="+", choices=list(KERNELS), default=list(KERNELS))
+    parser.add_argument("--sizes", nargs="+", choices=[s[0] for s in problem_sizes],
+                        default=[s[0] for s in problem_sizes])
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", metavar="PATH", help="save the results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", default=BASELINE_JSON,
+                        help=f"baseline JSON to compare against (default {BASELINE_JSON})")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="overwrite the baseline with these results")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="flag kernels slower than baseline by more than this fraction")
+    cli = parser.parse_args()
+
+    sizes = [s for s in problem_sizes if s[0] in cli.sizes]
+    results = run_benchmarks(cli.kernels, sizes, cli.min_time, cli.repeats,
+                             on_result=lambda k, s, r: print(f"{k:24} {s:7} {r:14,.0f} ops/s"))
+
+    report = {
+        "meta": {
+            "created":  time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python":   platform.python_version(),
+            "numpy":    np.__version__,
+            "machine":  platform.machine(),
+            "platform": platform.platform(),
+            "cpus":     os.cpu_count(),
+            "min_time": cli.min_time,
+            "repeats":  cli.repeats,
+        },
+        "results": results,
+    }
+    for path in filter(None, [cli.output, cli.baseline if cli.update_baseline else None]):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved: {path}")
+
+    if cli.update_baseline or not os.path.isfile(cli.baseline):
+        return 0
+
+    with open(cli.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = 0
+    print(f"\n--- vs baseline {cli.baseline} ---")
+    for name, size_label, base, rate, ratio in compare(results, baseline):
+        flag = "REGRESSION" if ratio < 1 - cli.tolerance else ""
+        regressions += bool(flag)
+        print(f"{name:24} {size_label:7} {base:14,.0f} → {rate:14,.0f} ops/s  ×{ratio:5.2f} {flag}")
+    print(f"{regressions} regression(s) beyond {cli.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,87 +1,434 @@
-import random
-from problem import create_random_schedule, evaluate
+import os, random
+import multiprocessing as mp
+import numpy as np
+from neighborhood import steepest_descent
+from problem import Schedule, apply_move, current_instance
+from stopping import StopCriteria
 
 def run_genetic_algorithm(
     *,
-    generations     = 100,
-    population_size = 50,
-    crossover_rate  = 0.8,
-    mutation_rate   = 0.02,
-    tournament_size = 3,
-    elitism         = True,
-    seed            = None
+    instance            = None,
+    generations         = 100,
+    population_size     = 50,
+    crossover_rate      = 0.8,
+    mutation_rate       = 0.02,
+    tournament_size     = 3,
+    elitism             = True,
+    vectorized          = False,
+    local_search_rate   = 0.0,
+    local_search_moves  = 20,
+    local_search_policy = 'random',
+    islands             = 1,
+    migration_every     = 10,
+    migrants            = 2,
+    topology            = 'ring',
+    workers             = None,
+    time_budget         = None,
+    target_score        = None,
+    stall_iterations    = None,
+    info                = None,
+    trace               = None,
+    initial             = None,
+    seed                = None
 ):
+    """
+    Generational GA with tournament selection and nurse-wise uniform crossover.
+    `initial` (Schedule or list rows) is injected into the starting population.
+    Returns the best Schedule found.
+    `instance` is the ProblemInstance to solve (defaults to the problem module globals).
+    Stops after `generations` (None = no cap), or earlier on time_budget (seconds),
+    target_score or stall_iterations (generations without a new best); `info`
+    receives the StopCriteria report.
+    vectorized=True runs the same operators on the population as one (P, nurses, days)
+    int8 array (see evolve_population); it uses a numpy Generator, so seeded results
+    differ from the default engine.
+    Memetic mode: local_search_rate > 0 polishes that fraction of each generation's
+    offspring with steepest_descent (at most local_search_moves improving single-cell
+    moves) before ranking; local_search_policy picks them at 'random' or as the 'best'
+    scoring ones. It applies to every engine.
+    islands > 1 always runs the vectorized engine (`vectorized` is ignored) on `islands`
+    subpopulations of population_size each, dealt to `workers` hosts (default one per
+    island, capped at the CPU count): one in this process, the others persistent worker
+    processes that evolve concurrently with it. Every `migration_every` generations each
+    island sends copies of its `migrants` best individuals to another island (topology
+    'ring': i -> i + 1, 'random': a fresh random derangement), where they replace the
+    worst ones; migrants=0 evolves the islands in isolation. Only the migrants cross
+    process boundaries, as raw int8 bytes.
+    A tracing.Trace passed as `trace` samples (generation, generation best, best,
+    evaluations) every trace.every generations and times the 'initialization',
+    'variation' (selection, crossover, mutation), 'evaluation' and 'local_search'
+    phases; island runs are sampled per migration epoch and time 'epoch' and 'migration'.
+    """
+    if local_search_policy not in LOCAL_SEARCH_POLICIES:
+        raise ValueError(f"local_search_policy must be one of {LOCAL_SEARCH_POLICIES}")
+    instance = instance or current_instance()
+    if trace is not None:
+        t = trace.begin()
+    stop = StopCriteria(generations, time_budget=time_budget, target_score=target_score,
+                        stall_iterations=stall_iterations)
+    memetic = ((local_search_rate, local_search_moves, local_search_policy)
+               if local_search_rate > 0 else None)
+    if islands > 1:
+        best = _run_islands(instance, stop, seed, initial, islands=islands,
+                            migration_every=migration_every, migrants=migrants, topology=topology,
+                            workers=workers, target_score=target_score, memetic=memetic,
+                            trace=trace, population_size=population_size, crossover_rate=crossover_rate,
+                            mutation_rate=mutation_rate, tournament_size=tournament_size,
+                            elitism=elitism)
+        if info is not None:
+            info.update(stop.report())
+        return best
+    if vectorized:
+        best = _run_vectorized(instance, stop, np.random.default_rng(seed), initial,
+                               memetic=memetic, trace=trace, population_size=population_size,
+                               crossover_rate=crossover_rate, mutation_rate=mutation_rate,
+                               tournament_size=tournament_size, elitism=elitism)
+        if info is not None:
+            info.update(stop.report())
+        return best
 
-    if seed is not None:
-        random.seed(seed)
+    rng = random.Random(seed)
 
-    population = [create_random_schedule() for _ in range(population_size)]
+    population = [Schedule.from_lists(instance.random_schedule(rng)) for _ in range(population_size)]
+    if initial is not None:
+        population[0] = Schedule.from_lists(initial)
     
-    ranked_population = []
-    for indiv in population:
-        ranked_population.append((evaluate(indiv), indiv))
+    ranked_population = list(zip(instance.evaluate_batch(population).tolist(), population))
     
     ranked_population.sort(key=lambda x: x[0])
     
     best_overall_score = ranked_population[0][0]
-    best_overall_schedule = [row[:] for row in ranked_population[0][1]]
+    best_overall_schedule = ranked_population[0][1].copy()
+    if trace is not None:
+        t = trace.lap('initialization', t)
 
-    for gen in range(generations):
+    gen = 0
+    while not stop.should_stop(gen, best_overall_score):
         next_generation = []
         
         if elitism:
-            best_current = [row[:] for row in ranked_population[0][1]]
+            best_current = ranked_population[0][1].copy()
             next_generation.append(best_current)
 
         while len(next_generation) < population_size:
-            parent1 = tournament_selection(ranked_population, tournament_size)
-            parent2 = tournament_selection(ranked_population, tournament_size)
+            parent1 = tournament_selection(ranked_population, tournament_size, rng)
+            parent2 = tournament_selection(ranked_population, tournament_size, rng)
             
-            if random.random() < crossover_rate:
-                offspring = crossover_uniform_nurse(parent1, parent2)
+            if rng.random() < crossover_rate:
+                offspring = crossover_uniform_nurse(parent1, parent2, rng)
             else:
-                offspring = [row[:] for row in parent1]
+                offspring = parent1.copy()
 
-            mutate(offspring, mutation_rate)
+            mutate(offspring, mutation_rate, rng, instance.shifts)
             
             next_generation.append(offspring)
             
         population = next_generation
-        
-        ranked_population = []
-        for indiv in population:
-            score = evaluate(indiv)
-            ranked_population.append((score, indiv))
-            
+        if trace is not None:
+            t = trace.lap('variation', t)
+
+        scores = instance.evaluate_batch(population)
+        if trace is not None:
+            t = trace.lap('evaluation', t)
+        if memetic is not None:
+            _polish(instance, population, scores, memetic, lambda n, k: rng.sample(range(n), k))
+            if trace is not None:
+                t = trace.lap('local_search', t)
+        ranked_population = list(zip(scores.tolist(), population))
+        for score, indiv in ranked_population:
             if score < best_overall_score:
                 best_overall_score = score
-                best_overall_schedule = [row[:] for row in indiv]
+                best_overall_schedule = indiv.copy()
         
         ranked_population.sort(key=lambda x: x[0])
+        if trace is not None and gen % trace.every == 0:
+            trace.record(gen, ranked_population[0][0], best_overall_score,
+                         (gen + 2) * population_size)
+        gen += 1
 
+    if info is not None:
+        info.update(stop.report())
     return best_overall_schedule
 
 
-def tournament_selection(ranked_pop, k):
-    candidates = random.sample(ranked_pop, k)
+def _run_vectorized(instance, stop, rng, initial, *, memetic, trace, population_size, **operators):
+    island = _new_island(instance, rng, population_size, initial, operators, memetic)
+    _evolve_island(island, stop, trace)
+    return Schedule.from_array(island['best_cells'])
+
+
+def _new_island(instance, rng, population_size, initial, operators, memetic=None):
+    """Population-as-array state: (P, nurses, days) int8 population, scores and best-so-far."""
+    population = rng.integers(0, len(instance.shifts), size=(population_size, instance.num_nurses,
+                                                             instance.num_days), dtype=np.int8)
+    if initial is not None:
+        population[0] = np.asarray(initial, dtype=np.int8)
+    scores = instance.evaluate_batch(population)
+    best = int(np.argmin(scores))
+    return {
+        'instance':   instance,
+        'rng':        rng,
+        'operators':  operators,
+        'memetic':    memetic,
+        'population': population,
+        'scores':     scores,
+        'best_score': int(scores[best]),
+        'best_cells': population[best].copy(),
+    }
+
+
+def _evolve_island(island, stop, trace=None):
+    """Runs generations until `stop` fires; returns how many were done."""
+    instance = island['instance']
+    size = len(island['population'])
+    if trace is not None:
+        t = trace.lap('initialization', trace.start)
+    gen = 0
+    while not stop.should_stop(gen, island['best_score']):
+        island['population'] = evolve_population(island['population'], island['scores'], island['rng'],
+                                                 len(instance.shifts), **island['operators'])
+        if trace is not None:
+            t = trace.lap('variation', t)
+        island['scores'] = scores = instance.evaluate_batch(island['population'])
+        if trace is not None:
+            t = trace.lap('evaluation', t)
+        if island['memetic'] is not None:
+            rng = island['rng']
+            _polish(instance, island['population'], scores, island['memetic'],
+                    lambda n, k: rng.choice(n, k, replace=False))
+            if trace is not None:
+                t = trace.lap('local_search', t)
+
+        best = int(np.argmin(scores))
+        if scores[best] < island['best_score']:
+            island['best_score'] = int(scores[best])
+            island['best_cells'] = island['population'][best].copy()
+        if trace is not None and gen % trace.every == 0:
+            trace.record(gen, int(scores[best]), island['best_score'], (gen + 2) * size)
+        gen += 1
+    return gen
+
+
+TOPOLOGIES = ('ring', 'random')
+
+def _run_islands(instance, stop, seed, initial, *, islands, migration_every, migrants, topology,
+                 workers, target_score, memetic, trace, population_size, **operators):
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"topology must be one of {TOPOLOGIES}")
+    if not 0 <= migrants <= population_size:
+        raise ValueError("migrants must be between 0 and population_size")
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(64) for _ in range(islands)]
+    if initial is not None:
+        initial = np.asarray(initial, dtype=np.int8)
+
+    # islands are dealt round-robin to the hosts; one host runs in this process
+    workers = max(1, min(workers or os.cpu_count() or 1, islands))
+    groups = [list(range(w, islands, workers)) for w in range(workers)]
+    specs = [([seeds[i] for i in group], initial if 0 in group else None) for group in groups]
+    hosts = [_LocalHost(instance, population_size, operators, memetic, *specs[0])]
+    hosts += [_ProcessHost(instance, population_size, operators, memetic, *spec) for spec in specs[1:]]
+
+    if trace is not None:
+        t = trace.lap('initialization', trace.start)
+    try:
+        best_scores = [float('inf')] * islands
+        immigrants = [None] * islands
+        done = 0
+        epochs = 0
+        while not stop.should_stop(done, min(best_scores)):
+            span = migration_every if stop.max_iterations is None else min(migration_every,
+                                                                        stop.max_iterations - done)
+            limits = dict(time_budget=stop.remaining(), target_score=target_score)
+            # worker hosts first: the local host's send() evolves its islands synchronously
+            for host, group in reversed(list(zip(hosts, groups))):
+                host.send((span, migrants, [immigrants[i] for i in group], limits))
+
+            emigrants = [None] * islands
+            epoch = 0
+            for host, group in zip(hosts, groups):
+                for i, (score, gens, outgoing) in zip(group, host.receive()):
+                    best_scores[i], emigrants[i] = score, outgoing
+                    epoch = max(epoch, gens)
+            done += epoch
+            if trace is not None:
+                t = trace.lap('epoch', t)
+
+            immigrants = [None] * islands
+            for source, target in enumerate(migration_targets(islands, topology, rng)):
+                immigrants[target] = emigrants[source]
+            if trace is not None:
+                t = trace.lap('migration', t)
+                if epochs % trace.every == 0:
+                    trace.record(done, min(best_scores), min(best_scores),
+                                 (done + 1) * population_size * islands)
+            epochs += 1
+
+        for host in reversed(hosts):
+            host.send('best')
+        finals = [final for host in hosts for final in host.receive()]
+    finally:
+        for host in hosts:
+            host.close()
+
+    score, cells = min(finals, key=lambda final: final[0])
+    return Schedule.from_array(np.frombuffer(cells, dtype=np.int8).reshape(instance.num_nurses,
+                                                                            instance.num_days))
+
+
+def migration_targets(num_islands, topology, rng=random):
+    """Receiving island of each island's migrants: ring i -> i + 1, or a random derangement."""
+    if num_islands < 2:
+        return list(range(num_islands))
+    if topology == 'ring':
+        return [(i + 1) % num_islands for i in range(num_islands)]
+    targets = list(range(num_islands))
+    while any(i == target for i, target in enumerate(targets)):
+        rng.shuffle(targets)
+    return targets
+
+
+def _serve_islands(islands, message):
+    """
+    Answers one master message for the islands of a host: 'best' -> [(best score, best
+    cells bytes)], or (generations, migrants, immigrants, limits) -> [(best score,
+    generations done, emigrant bytes)] after inserting the immigrants and evolving.
+    """
+    if message == 'best':
+        return [(island['best_score'], island['best_cells'].tobytes()) for island in islands]
+
+    generations, migrants, immigrants, limits = message
+    replies = []
+    for island, incoming in zip(islands, immigrants):
+        instance = island['instance']
+        if incoming:  # None before the first migration, empty with migrants=0
+            arrivals = np.frombuffer(incoming, dtype=np.int8).reshape(-1, instance.num_nurses,
+                                                                       instance.num_days)
+            worst = np.argsort(island['scores'])[-len(arrivals):]
+            island['population'][worst] = arrivals
+            island['scores'][worst] = instance.evaluate_batch(arrivals)
+        gens = _evolve_island(island, StopCriteria(generations, **limits))
+        outgoing = island['population'][np.argsort(island['scores'])[:migrants]]
+        replies.append((island['best_score'], gens, outgoing.tobytes()))
+    return replies
+
+
+def _island_process(instance, population_size, operators, memetic, seeds, initial, inbox, outbox):
+    islands = [_new_island(instance, np.random.default_rng(seed), population_size,
+                           initial if i == 0 else None, operators, memetic)
+               for i, seed in enumerate(seeds)]
+    for message in iter(inbox.get, None):
+        outbox.put(_serve_islands(islands, message))
+
+
+class _LocalHost:
+    """Islands evolved in the calling process (same interface as _ProcessHost)."""
+
+    def __init__(self, instance, population_size, operators, memetic, seeds, initial):
+        self.islands = [_new_island(instance, np.random.default_rng(seed), population_size,
+                                    initial if i == 0 else None, operators, memetic)
+                        for i, seed in enumerate(seeds)]
+        self.reply = None
+
+    def send(self, message):
+        self.reply = _serve_islands(self.islands, message)
+
+    def receive(self):
+        return self.reply
+
+    def close(self):
+        pass
+
+
+class _ProcessHost:
+    """Islands kept alive in a worker process; messages travel over two queues."""
+
+    def __init__(self, instance, population_size, operators, memetic, seeds, initial):
+        self.inbox, self.outbox = mp.Queue(), mp.Queue()
+        self.process = mp.Process(target=_island_process, daemon=True,
+                                  args=(instance, population_size, operators, memetic, seeds,
+                                        initial, self.inbox, self.outbox))
+        self.process.start()
+
+    def send(self, message):
+        self.inbox.put(message)
+
+    def receive(self):
+        return self.outbox.get()
+
+    def close(self):
+        self.inbox.put(None)
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+LOCAL_SEARCH_POLICIES = ('random', 'best')
+
+def _polish(instance, population, scores, memetic, sample):
+    """
+    Memetic step: steepest descent on a share of `population` (Schedules, or rows of a
+    (P, nurses, days) array), updating `scores` in place. `sample(n, k)` draws k of n indices.
+    """
+    rate, max_moves, policy = memetic
+    count = max(1, round(rate * len(population)))
+    if policy == 'best':
+        chosen = np.argsort(scores, kind='stable')[:count]
+    else:
+        chosen = sample(len(population), count)
+
+    for i in chosen:
+        if isinstance(population, np.ndarray):
+            schedule = Schedule.from_array(population[i])
+            scores[i] += steepest_descent(instance, schedule, max_moves)
+            population[i] = np.asarray(schedule)
+        else:
+            scores[i] += steepest_descent(instance, population[i], max_moves)
+
+
+def evolve_population(population, scores, rng, num_shifts, *, crossover_rate=0.8, mutation_rate=0.02,
+                      tournament_size=3, elitism=True):
+    """
+    One generation on a (P, nurses, days) int8 population with scores (P,): tournament
+    selection (contenders drawn with replacement), nurse-wise uniform crossover and
+    per-cell mutation, all as array operations. Returns the next population.
+    """
+    size, num_nurses, _ = population.shape
+    num_children = size - 1 if elitism else size
+
+    # Tournament selection: winners[0] / winners[1] are the two parents of each child
+    contenders = rng.integers(0, size, size=(2, num_children, tournament_size))
+    winners = np.take_along_axis(contenders, scores[contenders].argmin(axis=2)[..., None], axis=2)[..., 0]
+
+    # Nurse-wise uniform crossover for a crossover_rate share of the children (others copy parent 1)
+    from_p2 = rng.random((num_children, num_nurses), dtype=np.float32) < 0.5
+    from_p2 &= rng.random((num_children, 1), dtype=np.float32) < crossover_rate
+    children = np.where(from_p2[:, :, None], population[winners[1]], population[winners[0]])
+
+    # Mutation: every cell independently with probability mutation_rate
+    mutated = rng.random(children.shape, dtype=np.float32) < mutation_rate
+    children[mutated] = rng.integers(0, num_shifts, size=int(mutated.sum()), dtype=np.int8)
+
+    if elitism:
+        children = np.concatenate((population[np.argmin(scores)][None], children))
+    return children
+
+
+def tournament_selection(ranked_pop, k, rng=random):
+    candidates = rng.sample(ranked_pop, k)
     best_candidate = min(candidates, key=lambda x: x[0])
     return best_candidate[1]
 
 
-def crossover_uniform_nurse(p1, p2):
+def crossover_uniform_nurse(p1, p2, rng=random):
 
-    offspring = []
-    for i in range(len(p1)):
-        if random.random() < 0.5:
-            offspring.append(p1[i][:])
-        else:
-            offspring.append(p2[i][:])
-    return offspring
+    sources = [p1 if rng.random() < 0.5 else p2 for _ in range(len(p1))]
+    return Schedule.from_row_sources(sources)
 
 
-def mutate(schedule, rate):
+def mutate(schedule, rate, rng=random, shifts=(0, 1, 2)):
 
     for r in range(len(schedule)):
         for c in range(len(schedule[0])):
-            if random.random() < rate:
-                schedule[r][c] = random.choice([0, 1, 2])
\ No newline at end of file
+            if rng.random() < rate:
+                apply_move(schedule, r, c, rng.choice(shifts))
@@ -0,0 +1,181 @@
+# moves.py
+
+from collections import namedtuple
+
+from problem import OFF_SHIFT, Move
+
+OPERATORS = ('change', 'swap', 'block', 'off')
+
+
+class CompoundMove(namedtuple("CompoundMove", "operator changes")):
+    """
+    A move built from several single-cell Moves (`changes`, at most one per cell),
+    applied to and reverted on the working schedule in place.
+    """
+    __slots__ = ()
+
+    def apply(self, schedule, counts=None):
+        for change in self.changes:
+            change.apply(schedule, counts)
+
+    def revert(self, schedule, counts=None):
+        for change in reversed(self.changes):
+            change.revert(schedule, counts)
+
+    def cells(self):
+        return [(change.nurse, change.day) for change in self.changes]
+
+
+# Operators: (instance, schedule, counts, rng, shifts) -> (CompoundMove, score delta).
+# `counts` is the coverage_counts cache of `schedule`; nothing is modified.
+
+def change_move(instance, schedule, counts, rng, shifts):
+    """One cell to a different shift."""
+    nurse = rng.randint(0, instance.num_nurses - 1)
+    day   = rng.randint(0, instance.num_days - 1)
+    old   = schedule[nurse, day]
+    new   = rng.choice([s for s in shifts if s != old])
+    delta = instance.delta_evaluate(schedule, nurse, day, new, counts)
+    return CompoundMove('change', (Move(nurse, day, old, new),)), delta
+
+
+def swap_move(instance, schedule, counts, rng, shifts, tries=5):
+    """Two nurses exchange their shifts on one day; the day's coverage is unchanged."""
+    day = rng.randint(0, instance.num_days - 1)
+    for _ in range(tries):
+        n1 = rng.randint(0, instance.num_nurses - 1)
+        n2 = rng.randint(0, instance.num_nurses - 1)
+        s1, s2 = schedule[n1, day], schedule[n2, day]
+        if s1 != s2:
+            break
+    else:
+        return CompoundMove('swap', ()), 0
+
+    delta = (_row_delta(instance, schedule[n1], day, (s2,))
+             + _row_delta(instance, schedule[n2], day, (s1,)))
+    return CompoundMove('swap', (Move(n1, day, s1, s2), Move(n2, day, s2, s1))), delta
+
+
+def block_move(instance, schedule, counts, rng, shifts, max_length=4):
+    """Days [start, start + length) of one nurse all set to one shift (length >= 2)."""
+    nurse  = rng.randint(0, instance.num_nurses - 1)
+    length = rng.randint(2, max(2, min(max_length, instance.num_days)))
+    start  = rng.randint(0, max(0, instance.num_days - length))
+    length = min(length, instance.num_days - start)
+    new    = rng.choice(shifts)
+
+    row = schedule[nurse]
+    changes = tuple(Move(nurse, day, row[day], new)
+                    for day in range(start, start + length) if row[day] != new)
+    delta = _row_delta(instance, row, start, (new,) * length)
+    for change in changes:
+        delta += _coverage_delta(instance, counts, change.day, change.old, change.new)
+    return CompoundMove('block', changes), delta
+
+
+def off_move(instance, schedule, counts, rng, shifts, tries=5):
+    """A working day of one nurse becomes a day off (breaks long working streaks)."""
+    works = instance.works
+    for _ in range(tries):
+        nurse = rng.randint(0, instance.num_nurses - 1)
+        day   = rng.randint(0, instance.num_days - 1)
+        old   = schedule[nurse, day]
+        if works[old]:
+            break
+    else:
+        return CompoundMove('off', ()), 0
+
+    delta = instance.delta_evaluate(schedule, nurse, day, OFF_SHIFT, counts)
+    return CompoundMove('off', (Move(nurse, day, old, OFF_SHIFT),)), delta
+
+
+MOVE_FUNCS = {
+    'change': change_move,
+    'swap':   swap_move,
+    'block':  block_move,
+    'off':    off_move,
+}
+
+
+def _coverage_delta(instance, counts, day, old, new):
+    """Coverage part of delta_evaluate for one cell (cells on different days add up)."""
+    required, day_counts = instance.required, counts[day]
+    return ((day_counts[old] <= required[old]) - (day_counts[new] < required[new])) * instance.hard_weight
+
+
+def _row_delta(instance, row, start, new_shifts):
+    """Score change of writing `new_shifts` into row[start:], without the coverage part."""
+    end = start + len(new_shifts)
+    lo, hi = max(start - 1, 0), min(end + 1, instance.num_days)
+    old_window = list(row[lo:hi])
+    new_window = old_window[:start - lo] + list(new_shifts) + old_window[end - lo:]
+
+    forbidden = instance.forbidden_next
+    hard = (sum(forbidden[a][b] for a, b in zip(new_window, new_window[1:]))
+            - sum(forbidden[a][b] for a, b in zip(old_window, old_window[1:])))
+
+    soft = 0
+    works = instance.works
+    if any(works[a] != works[b] for a, b in zip(row[start:end], new_shifts)):
+        new_row = list(row)
+        new_row[start:end] = new_shifts
+        soft = _streak_excess(instance, new_row) - _streak_excess(instance, row)
+    return hard * instance.hard_weight + soft * instance.soft_weight
+
+
+def _streak_excess(instance, row):
+    works, limit = instance.works, instance.max_consecutive_work_days
+    excess = streak = 0
+    for shift in row:
+        if works[shift]:
+            streak += 1
+            if streak > limit:
+                excess += 1
+        else:
+            streak = 0
+    return excess
+
+
+class OperatorSelector:
+    """
+    Adaptive operator selection: roulette choice with probability proportional to
+    each operator's exponentially smoothed success rate (never below `floor`).
+    """
+    __slots__ = ("names", "funcs", "rates", "tries", "successes", "smoothing", "floor")
+
+    def __init__(self, names=OPERATORS, smoothing=0.05, floor=0.05):
+        unknown = [name for name in names if name not in MOVE_FUNCS]
+        if unknown:
+            raise ValueError(f"unknown move operators {unknown}; choose from {OPERATORS}")
+        self.names     = tuple(names)
+        self.funcs     = tuple(MOVE_FUNCS[name] for name in self.names)
+        self.rates     = [1.0] * len(self.names)
+        self.tries     = [0] * len(self.names)
+        self.successes = [0] * len(self.names)
+        self.smoothing = smoothing
+        self.floor     = floor
+
+    def choose(self, rng):
+        weights = [max(rate, self.floor) for rate in self.rates]
+        pick = rng.random() * sum(weights)
+        for i, weight in enumerate(weights):
+            pick -= weight
+            if pick < 0:
+                return i
+        return len(weights) - 1
+
+    def propose(self, instance, schedule, counts, rng, shifts):
+        """Chooses an operator and draws a move with it: (operator index, CompoundMove, delta)."""
+        i = self.choose(rng)
+        move, delta = self.funcs[i](instance, schedule, counts, rng, shifts)
+        return i, move, delta
+
+    def update(self, i, success):
+        self.tries[i] += 1
+        self.successes[i] += success
+        self.rates[i] += self.smoothing * (success - self.rates[i])
+
+    def report(self):
+        return {name: {'tries': self.tries[i], 'successes': self.successes[i],
+                       'rate': round(self.rates[i], 4)}
+                for i, name in enumerate(self.names)}
@@ -0,0 +1,149 @@
+# neighborhood.py
+
+import numpy as np
+
+from problem import apply_move
+
+NO_MOVE = np.iinfo(np.int64).max  # table entry of the no-op move (cell already holds the shift)
+
+
+class DeltaTable:
+    """
+    Score deltas of the complete one-cell neighbourhood of a working schedule:
+    table[nurse, day, shift] is the change from setting that cell to `shift`
+    (NO_MOVE where it already holds it). Moves go through apply(), which keeps
+    the schedule, `counts` and the table in sync; only the moved cell's day
+    column and nurse row are rescored.
+    """
+    __slots__ = ("instance", "schedule", "counts", "table", "_day_counts", "_pairs",
+                 "_shifts", "_forbidden", "_required", "_works")
+
+    def __init__(self, instance, schedule, counts=None):
+        self.instance = instance
+        self.schedule = schedule
+        self.counts   = instance.coverage_counts(schedule) if counts is None else counts
+
+        self._shifts    = np.array(instance.shifts, dtype=np.int8)
+        self._forbidden = np.array(instance.forbidden_next, dtype=np.int64)
+        self._required  = np.array(instance.required, dtype=np.int64)
+        self._works     = np.array(instance.works)
+
+        self.table = np.empty((instance.num_nurses, instance.num_days, len(instance.shifts)),
+                              dtype=np.int64)
+        self.refresh()
+
+    def cells(self):
+        """Current schedule as an int8 (nurses, days) array."""
+        return np.asarray(self.schedule, dtype=np.int8)
+
+    def refresh(self):
+        """Recomputes the whole table (after the schedule was changed behind its back)."""
+        all_nurses = np.arange(self.instance.num_nurses)
+        all_days   = np.arange(self.instance.num_days)
+        cells = self.cells()
+        self._day_counts = np.array(self.counts, dtype=np.int64)
+        self._pairs = self._forbidden[cells[:, :-1], cells[:, 1:]].astype(bool)
+        self.table[:] = self._block(cells, all_nurses, all_days)
+
+    def apply(self, nurse, day, new_shift):
+        """apply_move() on the working schedule, then rescores column `day` and row `nurse`."""
+        old_shift = apply_move(self.schedule, nurse, day, new_shift, self.counts)
+        self._day_counts[day, old_shift] -= 1
+        self._day_counts[day, new_shift] += 1
+        cells = self.cells()
+        row = cells[nurse]
+        self._pairs[nurse] = self._forbidden[row[:-1], row[1:]]
+        all_nurses = np.arange(self.instance.num_nurses)
+        all_days   = np.arange(self.instance.num_days)
+        self.table[:, day] = self._block(cells, all_nurses, np.array([day]))[:, 0]
+        self.table[nurse]  = self._block(cells, np.array([nurse]), all_days)[0]
+        return old_shift
+
+    def violating(self):
+        """
+        (nurses, days) mask of the cells taking part in a hard violation: both cells of
+        a night -> morning pair, and every cell of a day with an under-covered shift.
+        Working streaks are left out: the shifts never include OFF_SHIFT, so no
+        single-cell move on a working cell can shorten one.
+        """
+        mask = np.zeros(self.table.shape[:2], dtype=bool)
+        mask[:, :-1] |= self._pairs
+        mask[:, 1:]  |= self._pairs
+        num_shifts = len(self._shifts)
+        under = (self._day_counts[:, :num_shifts] < self._required[:num_shifts]).any(axis=1)
+        mask[:, under] = True
+        return mask
+
+    def _block(self, cells, nurses, days):
+        """Deltas for the cells nurses x days, shape (len(nurses), len(days), shifts)."""
+        inst = self.instance
+        last = inst.num_days - 1
+        new = self._shifts
+        forbidden = self._forbidden
+
+        old = cells[np.ix_(nurses, days)][..., None]
+        hard = np.zeros(old.shape[:2] + new.shape, dtype=np.int64)
+
+        # Night -> morning with the neighbouring days (OFF = -1 indexes the trailing slot)
+        prev = cells[np.ix_(nurses, np.maximum(days - 1, 0))][..., None]
+        hard += np.where((days > 0)[None, :, None], forbidden[prev, new] - forbidden[prev, old], 0)
+        nxt = cells[np.ix_(nurses, np.minimum(days + 1, last))][..., None]
+        hard += np.where((days < last)[None, :, None], forbidden[new, nxt] - forbidden[old, nxt], 0)
+
+        # Coverage of each day column
+        day_counts = self._day_counts[days]
+        required = self._required
+        old_count = day_counts[np.arange(len(days))[None, :, None], old]
+        hard += old_count <= required[old]
+        hard -= (day_counts[:, :len(new)] < required[:len(new)])[None]
+
+        delta = hard * inst.hard_weight
+
+        # Consecutive working days only change where the cell flips to/from OFF
+        old_works = self._works[old]
+        flips = old_works != self._works[new]
+        if flips.any():
+            ending, starting = working_runs(self._works[cells[nurses]])
+            left  = np.where(days > 0, ending[:, np.maximum(days - 1, 0)], 0)[..., None]
+            right = np.where(days < last, starting[:, np.minimum(days + 1, last)], 0)[..., None]
+            limit = inst.max_consecutive_work_days
+            joined = (np.maximum(left + right + 1 - limit, 0)
+                      - np.maximum(left - limit, 0) - np.maximum(right - limit, 0))
+            delta += np.where(flips, np.where(old_works, -joined, joined), 0) * inst.soft_weight
+
+        delta[old == new] = NO_MOVE
+        return delta
+
+
+def working_runs(working):
+    """
+    For a (nurses, days) bool array, the length of the working streak ending at each
+    cell and of the one starting at it (both 0 on days off).
+    """
+    worked = np.cumsum(working, axis=1)
+    ending = worked - np.maximum.accumulate(np.where(working, 0, worked), axis=1)
+    rev = working[:, ::-1]
+    worked = np.cumsum(rev, axis=1)
+    starting = (worked - np.maximum.accumulate(np.where(rev, 0, worked), axis=1))[:, ::-1]
+    return ending, starting
+
+
+def steepest_descent(instance, schedule, max_moves, counts=None):
+    """
+    Best-improvement local search on `schedule` in place: applies the most improving
+    single-cell move until none improves or `max_moves` were made. Returns the total
+    score change (<= 0).
+    """
+    table = DeltaTable(instance, schedule, counts)
+    flat = table.table.reshape(-1)
+    num_shifts = table.table.shape[2]
+    total = 0
+    for _ in range(max_moves):
+        index = int(np.argmin(flat))
+        delta = int(flat[index])
+        if delta >= 0:
+            break
+        cell, new_shift = divmod(index, num_shifts)
+        table.apply(*divmod(cell, instance.num_days), new_shift)
+        total += delta
+    return total
@@ -1,50 +1,394 @@
 # problem.py
 
 import random
+from array import array
+from collections import namedtuple
+from dataclasses import dataclass, field
 
-# Constants
+import numpy as np
+
+# Constants (defaults for ProblemInstance; legacy scripts may still overwrite them)
 NUM_NURSES = 10
 NUM_DAYS = 20
 SHIFTS = [0, 1, 2]  # 0: Morning, 1: Evening, 2: Night
 OFF_SHIFT = -1
 MAX_CONSECUTIVE_WORK_DAYS = 7
 MIN_COVERAGE_PER_SHIFT = 2  # At least 2 nurses per shift per day
+HARD_PENALTY = 100
+SOFT_PENALTY = 10
+MORNING, NIGHT = 0, 2  # a night shift must not be followed by a morning shift
+
+
+class Schedule:
+    """
+    Nurse x day roster stored row-major in one contiguous array('b') (1 byte per cell).
+    copy() is O(1): both copies share the buffer until one of them writes a cell.
+    Read cells with schedule[nurse][day] or schedule[nurse, day]; write with
+    schedule[nurse, day] = shift (row views are read-only).
+    """
+    __slots__ = ("num_nurses", "num_days", "_cells", "_shared")
+
+    def __init__(self, num_nurses, num_days, cells=None):
+        self.num_nurses = num_nurses
+        self.num_days   = num_days
+        self._cells     = array("b", bytes(num_nurses * num_days)) if cells is None else cells
+        self._shared    = False
+
+    @classmethod
+    def from_lists(cls, rows):
+        """Builds a Schedule from list[list[int]] rows (a Schedule is just copied)."""
+        if isinstance(rows, Schedule):
+            return rows.copy()
+        cells = array("b")
+        for row in rows:
+            cells.extend(row)
+        return cls(len(rows), len(rows[0]) if len(rows) else 0, cells)
+
+    @classmethod
+    def from_array(cls, cells):
+        """Builds a Schedule from a (nurses, days) integer array (copied into an int8 buffer)."""
+        cells = np.ascontiguousarray(cells, dtype=np.int8)
+        return cls(cells.shape[0], cells.shape[1], array("b", cells.tobytes()))
+
+    @classmethod
+    def from_row_sources(cls, sources):
+        """Builds a Schedule whose row i is a copy of row i of Schedule sources[i] (same shape)."""
+        d = sources[0].num_days
+        rows = [memoryview(src._cells)[i * d:(i + 1) * d] for i, src in enumerate(sources)]
+        return cls(len(sources), d, array("b", b"".join(rows)))
+
+    def to_lists(self):
+        d = self.num_days
+        return [self._cells[i:i + d].tolist() for i in range(0, len(self._cells), d)]
+
+    def copy(self):
+        clone = Schedule(self.num_nurses, self.num_days, self._cells)
+        self._shared = clone._shared = True
+        return clone
+
+    @property
+    def nbytes(self):
+        return self._cells.itemsize * len(self._cells)
+
+    def __len__(self):
+        return self.num_nurses
+
+    def __getitem__(self, key):
+        if type(key) is tuple:
+            nurse, day = key
+            return self._cells[nurse * self.num_days + day]
+        if key < 0:
+            key += self.num_nurses
+        if not 0 <= key < self.num_nurses:
+            raise IndexError("nurse index out of range")
+        start = key * self.num_days
+        return memoryview(self._cells)[start:start + self.num_days].toreadonly()
+
+    def __setitem__(self, key, shift):
+        nurse, day = key
+        if self._shared:
+            # copy-on-write: take a private buffer before the first mutation
+            self._cells  = array("b", self._cells)
+            self._shared = False
+        self._cells[nurse * self.num_days + day] = shift
+
+    def __iter__(self):
+        for nurse in range(self.num_nurses):
+            yield self[nurse]
+
+    def __eq__(self, other):
+        if isinstance(other, Schedule):
+            return self.num_days == other.num_days and self._cells == other._cells
+        if isinstance(other, list):
+            return self.to_lists() == other
+        return NotImplemented
+
+    def __array__(self, dtype=None, copy=None):
+        view = np.frombuffer(self._cells, dtype=np.int8).reshape(self.num_nurses, self.num_days)
+        view.flags.writeable = False
+        if dtype is not None and np.dtype(dtype) != view.dtype:
+            return view.astype(dtype)
+        return view.copy() if copy else view
+
+    def __repr__(self):
+        return f"Schedule({self.num_nurses}x{self.num_days})"
+
+
+@dataclass(frozen=True)
+class ProblemInstance:
+    """
+    Immutable problem definition. Solvers take one as `instance=` instead of reading
+    module globals, so instances of different sizes can be solved concurrently.
+
+    Shifts are numbered 0..len(shifts)-1. The lookup tables have one extra trailing
+    slot for OFF_SHIFT, so they can be indexed directly with a cell value (-1 wraps).
+    """
+    num_nurses: int = NUM_NURSES
+    num_days: int = NUM_DAYS
+    shifts: tuple = tuple(SHIFTS)
+    min_coverage: tuple = MIN_COVERAGE_PER_SHIFT  # int, or one requirement per shift
+    max_consecutive_work_days: int = MAX_CONSECUTIVE_WORK_DAYS
+    hard_weight: int = HARD_PENALTY
+    soft_weight: int = SOFT_PENALTY
+
+    # precomputed lookup tables
+    required: tuple = field(init=False, repr=False, compare=False)
+    works: tuple = field(init=False, repr=False, compare=False)
+    forbidden_next: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        shifts = tuple(self.shifts)
+        if shifts != tuple(range(len(shifts))):
+            raise ValueError("shifts must be numbered 0..len(shifts)-1")
+        coverage = self.min_coverage
+        if isinstance(coverage, int):
+            coverage = (coverage,) * len(shifts)
+        coverage = tuple(coverage)
+        if len(coverage) != len(shifts):
+            raise ValueError("min_coverage needs one requirement per shift")
+
+        slots = shifts + (OFF_SHIFT,)
+        object.__setattr__(self, "shifts", shifts)
+        object.__setattr__(self, "min_coverage", coverage)
+        object.__setattr__(self, "required", coverage + (0,))
+        object.__setattr__(self, "works", tuple(s != OFF_SHIFT for s in slots))
+        object.__setattr__(self, "forbidden_next", tuple(
+            tuple(int(prev == NIGHT and nxt == MORNING) for nxt in slots) for prev in slots
+        ))
+
+    def random_schedule(self, rng=random):
+        """Generates a random initial schedule (list rows) for all nurses."""
+        shifts = self.shifts
+        return [[rng.choice(shifts) for _ in range(self.num_days)] for _ in range(self.num_nurses)]
+
+    def evaluate(self, schedule):
+        """Evaluates a schedule based on hard and soft constraint violations."""
+        if isinstance(schedule, Schedule):
+            schedule = schedule.to_lists()
+
+        n_nurses, n_days = self.num_nurses, self.num_days
+        forbidden_next, works = self.forbidden_next, self.works
+        hard_penalty = 0
+        soft_penalty = 0
+
+        for nurse in range(n_nurses):
+            row = schedule[nurse]
+
+            # Hard constraint: No night shift followed by morning shift
+            for day in range(n_days - 1):
+                hard_penalty += forbidden_next[row[day]][row[day + 1]]
+
+            # Soft constraint: Max consecutive working days
+            consecutive_work = 0
+            for day in range(n_days):
+                if works[row[day]]:
+                    consecutive_work += 1
+                    if consecutive_work > self.max_consecutive_work_days:
+                        soft_penalty += 1
+                else:
+                    consecutive_work = 0
+
+        # Hard constraint: Minimum coverage per shift per day
+        for day_counts in self.coverage_counts(schedule):
+            for s in self.shifts:
+                if day_counts[s] < self.required[s]:
+                    hard_penalty += self.required[s] - day_counts[s]
+
+        return hard_penalty * self.hard_weight + soft_penalty * self.soft_weight
 
-def create_random_schedule():
+    def evaluate_batch(self, schedules):
+        """
+        Vectorized evaluate() for a stacked (P, nurses, days) array (or a list of schedules,
+        either list[list[int]] or Schedule). Returns an int64 array of P scores.
+        """
+        batch = np.asarray(schedules, dtype=np.int8)
+
+        # Hard constraint: No night shift followed by morning shift
+        hard = ((batch[:, :, :-1] == NIGHT) & (batch[:, :, 1:] == MORNING)).sum(axis=(1, 2))
+
+        # Soft constraint: Max consecutive working days. Rows without a day off score
+        # a fixed excess; on the others the streak length per cell is the working days
+        # so far minus the count at the last day off.
+        limit     = self.max_consecutive_work_days
+        working   = batch != OFF_SHIFT
+        full_rows = working.all(axis=2)
+        soft      = full_rows.sum(axis=1) * max(0, batch.shape[2] - limit)
+        if not full_rows.all():
+            individual, _ = np.nonzero(~full_rows)
+            rows   = working[~full_rows]
+            worked = np.cumsum(rows, axis=1, dtype=np.int32)
+            at_off = np.maximum.accumulate(np.where(rows, 0, worked), axis=1)
+            excess = np.count_nonzero((worked - at_off) > limit, axis=1)
+            soft   = soft + np.bincount(individual, weights=excess, minlength=len(batch)).astype(np.int64)
+
+        # Hard constraint: Minimum coverage per shift per day
+        for s in self.shifts:
+            shift_counts = np.count_nonzero(batch == s, axis=1)
+            hard += np.maximum(self.required[s] - shift_counts, 0).sum(axis=1)
+
+        return hard * self.hard_weight + soft * self.soft_weight
+
+    def coverage_counts(self, schedule):
+        """
+        Per-day shift counts, counts[day][shift], used as a cache by delta_evaluate.
+        The trailing slot counts[day][OFF_SHIFT] tallies nurses that are off.
+        """
+        counts = [[0] * (len(self.shifts) + 1) for _ in range(self.num_days)]
+        for nurse in range(self.num_nurses):
+            row = schedule[nurse]
+            for day in range(self.num_days):
+                counts[day][row[day]] += 1
+        return counts
+
+    def delta_evaluate(self, schedule, nurse, day, new_shift, counts=None):
+        """
+        Score change of setting schedule[nurse][day] to new_shift, without applying it.
+        `counts` is the cache from coverage_counts(schedule); without it the day column
+        is recounted (O(num_nurses)). Streaks are only rescanned when the move toggles
+        between working and OFF_SHIFT, which costs O(run length).
+        """
+        row = schedule[nurse]
+        old_shift = row[day]
+        if new_shift == old_shift:
+            return 0
+
+        hard = 0
+        soft = 0
+
+        # Night -> morning with the neighbouring days
+        if day > 0:
+            forbidden = self.forbidden_next[row[day - 1]]
+            hard += forbidden[new_shift] - forbidden[old_shift]
+        if day < self.num_days - 1:
+            nxt = row[day + 1]
+            hard += self.forbidden_next[new_shift][nxt] - self.forbidden_next[old_shift][nxt]
+
+        # Coverage of the day column (the OFF slot requires 0, so it never scores)
+        if counts is None:
+            day_counts = [0] * (len(self.shifts) + 1)
+            for n in range(self.num_nurses):
+                day_counts[schedule[n][day]] += 1
+        else:
+            day_counts = counts[day]
+        required = self.required
+        if day_counts[old_shift] <= required[old_shift]:
+            hard += 1
+        if day_counts[new_shift] < required[new_shift]:
+            hard -= 1
+
+        # Consecutive working days only change when the cell flips to/from OFF
+        old_works = self.works[old_shift]
+        if old_works != self.works[new_shift]:
+            left, right = self._adjacent_runs(row, day)
+            joined = (self._excess_days(left + right + 1)
+                      - self._excess_days(left) - self._excess_days(right))
+            soft += -joined if old_works else joined
+
+        return hard * self.hard_weight + soft * self.soft_weight
+
+    def _excess_days(self, run_length):
+        return max(0, run_length - self.max_consecutive_work_days)
+
+    def _adjacent_runs(self, row, day):
+        """Lengths of the working streaks ending just before and starting just after `day`."""
+        works = self.works
+        left = 0
+        d = day - 1
+        while d >= 0 and works[row[d]]:
+            left += 1
+            d -= 1
+
+        right = 0
+        d = day + 1
+        while d < self.num_days and works[row[d]]:
+            right += 1
+            d += 1
+        return left, right
+
+
+def apply_move(schedule, nurse, day, new_shift, counts=None):
+    """Sets schedule[nurse][day] in place, keeping `counts` in sync. Returns the old shift."""
+    old_shift = schedule[nurse][day]
+    if counts is not None:
+        day_counts = counts[day]
+        day_counts[old_shift] -= 1
+        day_counts[new_shift] += 1
+    if isinstance(schedule, Schedule):
+        schedule[nurse, day] = new_shift
+    else:
+        schedule[nurse][day] = new_shift
+    return old_shift
+
+
+class Move(namedtuple("Move", "nurse day old new")):
+    """
+    Single-cell change schedule[nurse][day]: old -> new. Local search keeps one working
+    schedule and describes candidates by their Move (and score delta) instead of copies.
+    """
+    __slots__ = ()
+
+    def apply(self, schedule, counts=None):
+        apply_move(schedule, self.nurse, self.day, self.new, counts)
+
+    def revert(self, schedule, counts=None):
+        apply_move(schedule, self.nurse, self.day, self.old, counts)
+
+    def delta(self, instance, schedule, counts=None):
+        """Score change of applying this move to `schedule` (which must be in its `old` state)."""
+        return instance.delta_evaluate(schedule, self.nurse, self.day, self.new, counts)
+
+
+def random_move(schedule, rng=random, shifts=(0, 1, 2), changing=True):
+    """
+    Draws a random cell and a new shift for it. With changing=True the new shift
+    always differs from the current one; otherwise it may be a no-op move.
+    """
+    if isinstance(schedule, Schedule):
+        nurse = rng.randint(0, schedule.num_nurses - 1)
+        day   = rng.randint(0, schedule.num_days - 1)
+        old   = schedule[nurse, day]
+    else:
+        nurse = rng.randint(0, len(schedule) - 1)
+        day   = rng.randint(0, len(schedule[0]) - 1)
+        old   = schedule[nurse][day]
+    if changing:
+        new = rng.choice([s for s in shifts if s != old])
+    else:
+        new = rng.choice(shifts)
+    return Move(nurse, day, old, new)
+
+
+# Legacy module-level API: evaluates against an instance built from the globals above.
+
+_legacy_instances = {}
+
+def current_instance():
+    """ProblemInstance matching the current module globals (cached per configuration)."""
+    key = (NUM_NURSES, NUM_DAYS, tuple(SHIFTS), MIN_COVERAGE_PER_SHIFT, MAX_CONSECUTIVE_WORK_DAYS)
+    instance = _legacy_instances.get(key)
+    if instance is None:
+        instance = _legacy_instances[key] = ProblemInstance(
+            num_nurses=NUM_NURSES,
+            num_days=NUM_DAYS,
+            shifts=tuple(SHIFTS),
+            min_coverage=MIN_COVERAGE_PER_SHIFT,
+            max_consecutive_work_days=MAX_CONSECUTIVE_WORK_DAYS,
+        )
+    return instance
+
+def create_random_schedule(rng=random):
     """Generates a random initial schedule for all nurses."""
-    return [[random.choice(SHIFTS) for _ in range(NUM_DAYS)] for _ in range(NUM_NURSES)]
+    return current_instance().random_schedule(rng)
 
 def evaluate(schedule):
     """Evaluates a schedule based on hard and soft constraint violations."""
-    hard_penalty = 0
-    soft_penalty = 0
-
-    # Hard constraint: No night shift followed by morning shift
-    for nurse in range(NUM_NURSES):
-        for day in range(NUM_DAYS - 1):
-            if schedule[nurse][day] == 2 and schedule[nurse][day + 1] == 0:
-                hard_penalty += 1
-
-    # Soft constraint: Max 7 consecutive working days
-    for nurse in range(NUM_NURSES):
-        consecutive_work = 0
-        for day in range(NUM_DAYS):
-            if schedule[nurse][day] != OFF_SHIFT:
-                consecutive_work += 1
-                if consecutive_work > MAX_CONSECUTIVE_WORK_DAYS:
-                    soft_penalty += 1
-            else:
-                consecutive_work = 0
-
-    # Hard constraint: Minimum coverage per shift per day
-    for day in range(NUM_DAYS):
-        shift_counts = {s: 0 for s in SHIFTS}
-        for nurse in range(NUM_NURSES):
-            shift = schedule[nurse][day]
-            if shift in SHIFTS:
-                shift_counts[shift] += 1
-        for s in SHIFTS:
-            if shift_counts[s] < MIN_COVERAGE_PER_SHIFT:
-                hard_penalty += (MIN_COVERAGE_PER_SHIFT - shift_counts[s])
-
-    return hard_penalty * 100 + soft_penalty * 10
+    return current_instance().evaluate(schedule)
+
+def evaluate_batch(schedules):
+    return current_instance().evaluate_batch(schedules)
+
+def coverage_counts(schedule):
+    return current_instance().coverage_counts(schedule)
+
+def delta_evaluate(schedule, nurse, day, new_shift, counts=None):
+    return current_instance().delta_evaluate(schedule, nurse, day, new_shift, counts)
@@ -0,0 +1,160 @@
+# runner.py
+
+import os, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from problem       import ProblemInstance
+from tracing       import Trace
+from utils_results import append_row, append_trace, json_params, load_recorded, result_key
+
+
+def build_jobs(experiments, problem_sizes, num_runs, base_seed=None):
+    """
+    Expands the `experiments` / `problem_sizes` tables into independent jobs,
+    one per (size, run, experiment), in the same order as the serial loops.
+    Run r uses seed base_seed + r (or no seed when base_seed is None).
+    """
+    jobs = []
+    for size_label, nurses, days in problem_sizes:
+        for run in range(1, num_runs + 1):
+            seed = None if base_seed is None else base_seed + run
+            for exp in experiments:
+                jobs.append({
+                    "size":   size_label,
+                    "nurses": nurses,
+                    "days":   days,
+                    "run_id": run,
+                    "seed":   seed,
+                    "algo":   exp['label'],
+                    "func":   exp['func'],
+                    "args":   exp['args'],
+                })
+    return jobs
+
+
+def run_job(job, trace_every=None):
+    """
+    Solves one job in the current process and returns its results row.
+    With trace_every, the solver gets a tracing.Trace and the row carries its
+    to_dict() under "trace" (run_jobs strips it before writing the CSV).
+    """
+    instance = ProblemInstance(num_nurses=job["nurses"], num_days=job["days"])
+    run_args = dict(job["args"], instance=instance, seed=job["seed"])
+    trace    = None
+    if trace_every:
+        trace = run_args["trace"] = Trace(every=trace_every)
+
+    t0 = time.time()
+    schedule = job["func"](**run_args)
+    score    = instance.evaluate(schedule)
+    dt       = round(time.time() - t0, 4)
+
+    row = {
+        "size": job["size"],
+        "nurses": job["nurses"],
+        "days": job["days"],
+        "run_id": job["run_id"],
+        "seed": job["seed"],
+        "algo": job["algo"],
+        "params": json_params(job["args"]),
+        "score": score,
+        "runtime_s": dt
+    }
+    if trace is not None:
+        row["trace"] = trace.to_dict()
+    return row
+
+
+def job_key(job):
+    return result_key(job["size"], job["algo"], json_params(job["args"]), job["seed"])
+
+
+def run_jobs(jobs, csv_path=None, workers=None, on_row=None, resume=False,
+             trace_path=None, trace_every=100, store=None, flush_every=30.0):
+    """
+    Runs `jobs` on a ProcessPoolExecutor (workers defaults to os.cpu_count()).
+    Each finished row is appended to `csv_path` and passed to `on_row` as it
+    completes; the returned list is in job order. Solvers seed their own RNG,
+    so per-seed scores match a serial run. runtime_s is wall time inside the
+    worker and will include contention when workers share cores.
+
+    With resume=True, jobs already recorded in `csv_path` (same size, algo,
+    params and seed) are not rerun; their stored rows are returned instead.
+
+    With trace_path, every job that runs is traced (a sample each `trace_every`
+    iterations plus phase timings) and its trace is appended to trace_path as a
+    JSON line next to the row's identifying columns.
+
+    `store` (a utils_results.ResultStore) takes the rows instead of, or as well as, the
+    CSV, and is the resume index when given. Its buffered rows are committed once
+    `flush_every` seconds have passed since the last commit (or when its batch fills),
+    and on the way out of run_jobs; a killed campaign loses at most the rows finished
+    in that last interval, which resume=True then reruns (flush_every=0 commits every
+    row, at one transaction per job).
+    """
+    trace_every = trace_every if trace_path else None
+    workers = workers or os.cpu_count() or 1
+    rows = [None] * len(jobs)
+
+    if resume and store is not None:
+        recorded = store.recorded()
+    else:
+        recorded = load_recorded(csv_path) if resume and csv_path else {}
+    pending = []
+    for i, job in enumerate(jobs):
+        row = recorded.get(job_key(job))
+        if row is None:
+            pending.append(i)
+        else:
+            rows[i] = row
+    if recorded:
+        print(f"Resuming: {len(jobs) - len(pending)} of {len(jobs)} jobs already in "
+              f"{store.path if store is not None else csv_path}")
+
+    last_flush = time.monotonic()
+
+    def finish(i, row):
+        nonlocal last_flush
+        trace = row.pop("trace", None)
+        if trace is not None:
+            append_trace(trace_path, row, trace)
+        rows[i] = row
+        if csv_path:
+            append_row(csv_path, row)
+        if store is not None:
+            store.append(row)
+            if time.monotonic() - last_flush >= flush_every:
+                store.flush()
+                last_flush = time.monotonic()
+        if on_row is not None:
+            on_row(row)
+
+    try:
+        if workers == 1 or len(pending) <= 1:
+            for i in pending:
+                finish(i, run_job(jobs[i], trace_every))
+            return rows
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            futures = {pool.submit(run_job, jobs[i], trace_every): i for i in pending}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+        return rows
+    finally:
+        if store is not None:
+            store.flush()
+
+
+def group_results(rows):
+    """rows -> {size: {algo: {'scores': [...], 'times': [...]}}}, keeping row order."""
+    grouped = {}
+    for row in rows:
+        data = grouped.setdefault(row["size"], {}).setdefault(row["algo"], {'scores': [], 'times': []})
+        data['scores'].append(row["score"])
+        data['times'].append(row["runtime_s"])
+    return grouped
+
+
+def print_row(row):
+    print(f"{row['size']:6} run {row['run_id']:2} {row['algo']:18} → "
+          f"Score: {row['score']:8} | Time: {row['runtime_s']:8.4f}s")
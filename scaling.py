@@ -0,0 +1,247 @@
+# scaling.py
+
+import argparse, json, math, multiprocessing as mp, sys, time, tracemalloc
+
+import numpy as np
+
+from problem             import ProblemInstance
+from simulated_annealing import run_simulated_annealing
+from tabu_search         import run_tabu_search
+from genetic             import run_genetic_algorithm
+from ant_colony          import run_ant_colony
+from tracing             import Trace
+from utils_results       import append_row
+
+SCALING_CSV = "results/scaling_raw.csv"
+
+# Solvers under a time budget only: no iteration caps
+solvers = [
+    {
+        'label': 'SA-Exp',
+        'func':  run_simulated_annealing,
+        'args':  {'exponential': True, 'exp_alpha': 0.85, 'initial_temp': 100_000,
+                  'max_iterations': None}
+    },
+    {
+        'label': 'Tabu-Sampled',
+        'func':  run_tabu_search,
+        'args':  {'tabu_tenure': 10, 'neighborhood_size': 20, 'max_iterations': None}
+    },
+    {
+        'label': 'Tabu-Candidates',
+        'func':  run_tabu_search,
+        'args':  {'tabu_tenure': 10, 'neighborhood': 'candidates', 'max_iterations': None}
+    },
+    {
+        'label': 'GA',
+        'func':  run_genetic_algorithm,
+        'args':  {'population_size': 50, 'generations': None}
+    },
+    {
+        'label': 'GA-Vec',
+        'func':  run_genetic_algorithm,
+        'args':  {'population_size': 50, 'vectorized': True, 'generations': None}
+    },
+    {
+        'label': 'ACO',
+        'func':  run_ant_colony,
+        'args':  {'num_ants': 40, 'evaporation': 0.9, 'alpha': 1.0, 'beta': 2.0,
+                  'num_iterations': None}
+    },
+]
+
+SOLVERS = {s['label']: s for s in solvers}
+
+
+def geometric(lo, hi, factor=2):
+    """lo, lo * factor, ... up to hi (inclusive when reached exactly)."""
+    values, v = [], lo
+    while v <= hi:
+        values.append(int(round(v)))
+        v *= factor
+    return values
+
+
+def build_points(labels, nurses, days, budget, runs, base_seed, memory):
+    return [{"solver": label, "nurses": n, "days": d, "budget_s": budget,
+             "seed": base_seed + run, "run_id": run, "memory": memory}
+            for n in nurses for d in days for run in range(1, runs + 1) for label in labels]
+
+
+def _rss_mb():
+    import resource  # Unix only
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+
+def run_point(point):
+    """
+    Runs one solver on one roster size for point["budget_s"] seconds and returns its row.
+    memory='rss' reports the growth of the process high-water RSS over its post-import
+    level (meaningful because every point runs in a fresh process). 'tracemalloc' traces
+    Python and numpy allocations, which slows pure-Python loops, so its time_per_iter_s
+    is inflated.
+    """
+    solver = SOLVERS[point["solver"]]
+    memory = point["memory"]
+    base_mb = _rss_mb() if memory == "rss" else 0.0
+    if memory == "tracemalloc":
+        tracemalloc.start()
+
+    instance = ProblemInstance(num_nurses=point["nurses"], num_days=point["days"])
+    trace = Trace(every=1000, capacity=1)
+    info = {}
+    schedule = solver['func'](**solver['args'], instance=instance, seed=point["seed"],
+                              time_budget=point["budget_s"], info=info, trace=trace)
+    score = instance.evaluate(schedule)
+
+    if memory == "tracemalloc":
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    elif memory == "rss":
+        peak_mb = _rss_mb() - base_mb
+    else:
+        peak_mb = float("nan")
+
+    iterations = max(info["iterations"], 1)
+    phases = dict(trace.phases)
+    init_s = phases.pop("initialization", 0.0)
+    return {
+        "solver":          point["solver"],
+        "nurses":          point["nurses"],
+        "days":            point["days"],
+        "cells":           point["nurses"] * point["days"],
+        "run_id":          point["run_id"],
+        "seed":            point["seed"],
+        "budget_s":        point["budget_s"],
+        "memory":          memory,
+        "iterations":      info["iterations"],
+        "stop_reason":     info["stop_reason"],
+        "init_s":          round(init_s, 6),
+        "time_per_iter_s": sum(phases.values()) / iterations,
+        "phases_per_iter": json.dumps({p: s / iterations for p, s in sorted(phases.items())}),
+        "peak_mb":         round(peak_mb, 3),
+        "score":           score,
+    }
+
+
+def fit_power_law(x, y):
+    """
+    Least-squares fit of y = c * x**k on log-log axes -> (k, c, r2).
+    Points with y <= 0 are dropped; None when fewer than two distinct x remain.
+    """
+    pts = [(a, b) for a, b in zip(x, y) if b > 0]
+    if len({a for a, _ in pts}) < 2:
+        return None
+    lx = np.log([a for a, _ in pts])
+    ly = np.log([b for _, b in pts])
+    k, logc = np.polyfit(lx, ly, 1)
+    resid = ly - (k * lx + logc)
+    total = ((ly - ly.mean()) ** 2).sum()
+    r2 = 1.0 - (resid ** 2).sum() / total if total > 0 else 1.0
+    return float(k), float(math.exp(logc)), float(r2)
+
+
+def fit_nurses_days(rows, column):
+    """Exponents (a, b) of value ~ nurses**a * days**b (None unless both dimensions vary)."""
+    rows = [r for r in rows if r[column] > 0]
+    if len({r["nurses"] for r in rows}) < 2 or len({r["days"] for r in rows}) < 2:
+        return None
+    design = np.column_stack([np.ones(len(rows)),
+                              np.log([r["nurses"] for r in rows]),
+                              np.log([r["days"] for r in rows])])
+    coef, *_ = np.linalg.lstsq(design, np.log([r[column] for r in rows]), rcond=None)
+    return float(coef[1]), float(coef[2])
+
+
+def complexity_report(rows):
+    """
+    -> {solver: {"time_per_iter": fit, "init_s": fit, "peak_mb": fit,
+                 "nurses_days": (a, b), "phases": {phase: fit}}}
+    where each fit is fit_power_law(cells, value) = (exponent, constant, r2).
+    """
+    report = {}
+    for label in dict.fromkeys(r["solver"] for r in rows):
+        sub = [r for r in rows if r["solver"] == label]
+        cells = [r["cells"] for r in sub]
+        phase_rows = [json.loads(r["phases_per_iter"]) for r in sub]
+        phases = {p: fit_power_law(cells, [pr.get(p, 0.0) for pr in phase_rows])
+                  for p in dict.fromkeys(p for pr in phase_rows for p in pr)}
+        report[label] = {
+            "time_per_iter": fit_power_law(cells, [r["time_per_iter_s"] for r in sub]),
+            "init_s":        fit_power_law(cells, [r["init_s"] for r in sub]),
+            "peak_mb":       fit_power_law(cells, [r["peak_mb"] for r in sub]),
+            "nurses_days":   fit_nurses_days(sub, "time_per_iter_s"),
+            "phases":        phases,
+        }
+    return report
+
+
+def _fmt(fit):
+    return "      n/a      " if fit is None else f"cells^{fit[0]:5.2f} (R² {fit[2]:4.2f})"
+
+
+def print_report(report):
+    print("\n--- Empirical complexity (value ~ c · cells^k, cells = nurses × days) ---")
+    for label, fits in report.items():
+        nd = fits["nurses_days"]
+        split = "" if nd is None else f"  [nurses^{nd[0]:.2f} · days^{nd[1]:.2f}]"
+        print(f"\n{label}")
+        print(f"  time/iteration  {_fmt(fits['time_per_iter'])}{split}")
+        print(f"  initialization  {_fmt(fits['init_s'])}")
+        print(f"  peak memory     {_fmt(fits['peak_mb'])}")
+        ranked = sorted(((fit[0], phase) for phase, fit in fits["phases"].items() if fit),
+                        reverse=True)
+        for k, phase in ranked:
+            print(f"    phase {phase:14} {_fmt(fits['phases'][phase])}")
+        if ranked:
+            print(f"  steepest-growing phase: {ranked[0][1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scaling study: every solver on a geometric grid of roster sizes under "
+                    "a fixed time budget, with empirical complexity fits.")
+    parser.add_argument("--solvers", nargs="+", choices=list(SOLVERS), default=list(SOLVERS))
+    parser.add_argument("--nurses", nargs=2, type=int, default=[25, 400], metavar=("LO", "HI"))
+    parser.add_argument("--days", nargs=2, type=int, default=[14, 56], metavar=("LO", "HI"))
+    parser.add_argument("--factor", type=float, default=2.0, help="geometric step of the sweep")
+    parser.add_argument("--budget", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--runs", type=int, default=1, help="seeded runs per (solver, size)")
+    parser.add_argument("--seed", type=int, default=12345)
+    parser.add_argument("--memory", choices=["rss", "tracemalloc", "none"], default="rss",
+                        help="peak memory measure (tracemalloc slows the solvers down)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="concurrent points; >1 makes the timings contend for cores")
+    parser.add_argument("--output", metavar="PATH", default=SCALING_CSV)
+    parser.add_argument("--report", metavar="PATH", help="save the complexity fits as JSON")
+    cli = parser.parse_args()
+
+    nurses = geometric(*cli.nurses, cli.factor)
+    days   = geometric(*cli.days, cli.factor)
+    points = build_points(cli.solvers, nurses, days, cli.budget, cli.runs, cli.seed, cli.memory)
+    print(f"{len(points)} runs: nurses {nurses} × days {days}, {cli.budget:g}s each "
+          f"(≈{len(points) * cli.budget / max(cli.workers, 1) / 60:.0f} min)")
+
+    rows = []
+    t0 = time.time()
+    # A fresh process per point: RSS high-water marks and allocator state don't carry over
+    with mp.get_context("spawn").Pool(cli.workers, maxtasksperchild=1) as pool:
+        for row in pool.imap(run_point, points):
+            rows.append(row)
+            append_row(cli.output, row)
+            print(f"{row['solver']:16} {row['nurses']:4}×{row['days']:<3} "
+                  f"{row['iterations']:9} it  {row['time_per_iter_s'] * 1e3:10.4f} ms/it  "
+                  f"{row['peak_mb']:9.1f} MB  score {row['score']}")
+    print(f"Done in {time.time() - t0:.0f}s; rows appended to {cli.output}")
+
+    report = complexity_report(rows)
+    print_report(report)
+    if cli.report:
+        with open(cli.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved: {cli.report}")
+
+
+if __name__ == "__main__":
+    main()
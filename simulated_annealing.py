@@ -1,71 +1,315 @@
 import random, math
-from problem import create_random_schedule, evaluate
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from moves import OperatorSelector
+from problem import Schedule, apply_move, current_instance, random_move
+from stopping import StopCriteria
 def cooling_linear(T0, alpha, k):
     return T0 / (1 + alpha * k)
 
 def cooling_exponential(T0, alpha, k):
     return T0 * (alpha ** k)
 
+def lam_target_acceptance(progress):
+    """Lam & Delosme target acceptance rate for search progress k / max_iterations."""
+    if progress < 0.15:
+        return 0.44 + 0.56 * 560 ** (-progress / 0.15)
+    if progress < 0.65:
+        return 0.44
+    return 0.44 * 440 ** (-(progress - 0.65) / 0.35)
+
+def calibrate_initial_temp(instance, schedule, counts=None, rng=random, samples=200, acceptance=0.8):
+    """
+    T0 at which the mean uphill delta of `samples` random single-cell moves is accepted
+    with probability `acceptance`: T0 = -mean(uphill) / ln(acceptance).
+    """
+    uphill = []
+    for _ in range(samples):
+        nurse = rng.randint(0, instance.num_nurses - 1)
+        day   = rng.randint(0, instance.num_days - 1)
+        delta = instance.delta_evaluate(schedule, nurse, day, rng.choice(instance.shifts), counts)
+        if delta > 0:
+            uphill.append(delta)
+    if not uphill:
+        return 1.0
+    return -(sum(uphill) / len(uphill)) / math.log(acceptance)
+
+
+class AdaptiveCooling:
+    """
+    Closed-loop temperature control (modified Lam schedule): an exponential moving
+    average of the acceptance rate is steered towards lam_target_acceptance() by
+    nudging T by `adjust` each iteration. After `reheat_after` iterations without a new
+    best, T is raised back to reheat * T0.
+    """
+    __slots__ = ("T", "T0", "max_iterations", "adjust", "window",
+                 "reheat_after", "reheat", "rate", "stalled", "reheats")
+
+    def __init__(self, T0, max_iterations, *, adjust=0.99, window=100, reheat_after=None, reheat=0.5):
+        self.T              = T0
+        self.T0             = T0
+        self.max_iterations = max_iterations
+        self.adjust         = adjust
+        self.window         = window
+        self.reheat_after   = reheat_after
+        self.reheat         = reheat
+        self.rate           = 1.0
+        self.stalled        = 0
+        self.reheats        = 0
+
+    def update(self, k, accepted, improved):
+        """Feeds back iteration k's outcome; returns the temperature for the next one."""
+        self.rate += (accepted - self.rate) / self.window
+        if self.rate > lam_target_acceptance(k / self.max_iterations):
+            self.T *= self.adjust
+        else:
+            self.T /= self.adjust
+
+        self.stalled = 0 if improved else self.stalled + 1
+        if self.reheat_after is not None and self.stalled >= self.reheat_after:
+            self.T = max(self.T, self.reheat * self.T0)
+            self.stalled = 0
+            self.reheats += 1
+        return self.T
+
 def run_simulated_annealing(
     *,
-    initial_temp   = 100_000,
-    max_iterations = 2_000,
-    linear_alpha   = 1.0,
-    exp_alpha      = 0.85,
-    exponential    = False,
-    seed           = None
+    instance         = None,
+    initial_temp     = 100_000,
+    max_iterations   = 2_000,
+    linear_alpha     = 1.0,
+    exp_alpha        = 0.85,
+    exponential      = False,
+    adaptive         = False,
+    calibrate        = False,
+    reheat_after     = None,
+    operators        = None,
+    time_budget      = None,
+    target_score     = None,
+    stall_iterations = None,
+    info             = None,
+    trace            = None,
+    initial          = None,
+    seed             = None
 ):
     """
-    Runs SA with either linear or exponential cooling.
+    Runs SA with either linear or exponential cooling, or with adaptive=True an
+    AdaptiveCooling controller (target acceptance rate, reheating after `reheat_after`
+    iterations without improvement). calibrate=True replaces initial_temp with
+    calibrate_initial_temp() on the starting schedule.
     Added: seed for reproducibility.
     Minor: avoid repeated evaluate(best) recomputation; numerical safety for T.
+    Candidates are scored with delta_evaluate and applied in place on acceptance.
+    `operators` (names from moves.OPERATORS) replaces the single-cell draw with
+    compound moves chosen by a moves.OperatorSelector (success = improving move).
+    `initial` (Schedule or list rows) replaces the random start; returns a Schedule.
+    `instance` is the ProblemInstance to solve (defaults to the problem module globals).
+    Stops at max_iterations (None = no cap), or earlier on time_budget (seconds),
+    target_score or stall_iterations; a dict passed as `info` receives the
+    StopCriteria report (stop_reason, iterations, elapsed_s, best_score).
+    A tracing.Trace passed as `trace` samples (k, current, best, k + 1 evaluations) every
+    trace.every iterations and times the 'initialization' and 'search' phases.
     """
-    if seed is not None:
-        random.seed(seed)
+    instance = instance or current_instance()
+    if trace is not None:
+        t = trace.begin()
+    rng = random.Random(seed)
+    stop = StopCriteria(max_iterations, time_budget=time_budget, target_score=target_score,
+                        stall_iterations=stall_iterations, check_every=64)
 
-    current = create_random_schedule()
-    curr_score = evaluate(current)
+    current = Schedule.from_lists(initial if initial is not None else instance.random_schedule(rng))
+    curr_score = instance.evaluate(current)
+    counts     = instance.coverage_counts(current)
 
-    best = [row[:] for row in current]
+    best = current.copy()
     best_score = curr_score
 
-    for k in range(max_iterations):
+    if adaptive and max_iterations is None:
+        raise ValueError("adaptive cooling needs max_iterations")
+    if calibrate:
+        initial_temp = calibrate_initial_temp(instance, current, counts, rng)
+    controller = (AdaptiveCooling(initial_temp, max_iterations, reheat_after=reheat_after)
+                  if adaptive else None)
+    selector = OperatorSelector(operators) if operators else None
+    if trace is not None:
+        t = trace.lap('initialization', t)
+
+    k = 0
+    while not stop.should_stop(k, best_score):
         # pick temperature schedule
-        T = (cooling_exponential(initial_temp, exp_alpha, k)
-             if exponential
-             else cooling_linear(initial_temp, linear_alpha, k))
+        if controller is not None:
+            T = controller.T
+        else:
+            T = (cooling_exponential(initial_temp, exp_alpha, k)
+                 if exponential
+                 else cooling_linear(initial_temp, linear_alpha, k))
 
         # numerical guard: T can get extremely small
         if T < 1e-12:
             T = 1e-12
 
-        # tweak
-        candidate  = tweak_schedule(current)
-        new_score  = evaluate(candidate)
+        if selector is None:
+            # tweak (same draw as tweak_schedule), scored in place; plain locals rather than
+            # a Move keep this loop cheap
+            nurse     = rng.randint(0, instance.num_nurses - 1)
+            day       = rng.randint(0, instance.num_days - 1)
+            new_shift = rng.choice(instance.shifts)
+            new_score = curr_score + instance.delta_evaluate(current, nurse, day, new_shift, counts)
+        else:
+            op, move, delta = selector.propose(instance, current, counts, rng, instance.shifts)
+            new_score = curr_score + delta
+            selector.update(op, delta < 0)
 
         # acceptance
         if new_score < curr_score:
-            current = candidate
-            curr_score = new_score
+            accept = True
         else:
             # accept worse with probability
             prob = math.exp((curr_score - new_score) / T)
-            if random.random() < prob:
-                current = candidate
-                curr_score = new_score
+            accept = rng.random() < prob
+
+        if accept:
+            if selector is None:
+                apply_move(current, nurse, day, new_shift, counts)
+            else:
+                move.apply(current, counts)
+            curr_score = new_score
 
         # update best
-        if curr_score < best_score:
+        improved = curr_score < best_score
+        if improved:
             best_score = curr_score
-            best = [row[:] for row in current]
+            best = current.copy()
+
+        if controller is not None:
+            controller.update(k, accept, improved)
+        if trace is not None and k % trace.every == 0:
+            trace.record(k, curr_score, best_score, k + 1)
+        k += 1
 
+    if trace is not None:
+        trace.lap('search', t)
+    if info is not None:
+        info.update(stop.report())
+        if selector is not None:
+            info['operators'] = selector.report()
     return best
 
 
-def tweak_schedule(schedule):
-    new_schedule = [row[:] for row in schedule]
-    nurse = random.randint(0, len(new_schedule) - 1)
-    day   = random.randint(0, len(new_schedule[0]) - 1)
-    new_shift = random.choice([0, 1, 2])
-    new_schedule[nurse][day] = new_shift
+def run_parallel_tempering(
+    *,
+    instance         = None,
+    num_replicas     = 8,
+    t_min            = 1.0,
+    t_max            = 1_000.0,
+    max_iterations   = 2_000,
+    swap_every       = 50,
+    workers          = 1,
+    time_budget      = None,
+    target_score     = None,
+    stall_iterations = None,
+    info             = None,
+    trace            = None,
+    initial          = None,
+    seed             = None
+):
+    """
+    Replica-exchange SA: `num_replicas` chains run Metropolis moves at fixed temperatures
+    on a geometric ladder from t_min to t_max (max_iterations moves each, scored with
+    delta_evaluate). Every `swap_every` moves neighbouring temperatures try to exchange
+    states with probability min(1, exp((E_i - E_j) * (1/T_i - 1/T_j))).
+    workers > 1 advances the chains in that many processes between exchanges; results do
+    not depend on the worker count. Returns the best Schedule over all chains.
+    Stopping criteria are as in run_simulated_annealing, checked between exchanges
+    (iterations count moves per chain). A `trace` is sampled after each exchange round
+    (current = coldest replica) and times the 'initialization', 'metropolis' and
+    'exchange' phases.
+    """
+    instance = instance or current_instance()
+    if trace is not None:
+        t = trace.begin()
+    rng = random.Random(seed)
+    stop = StopCriteria(max_iterations, time_budget=time_budget, target_score=target_score,
+                        stall_iterations=stall_iterations)
+
+    ratio = (t_max / t_min) ** (1.0 / max(num_replicas - 1, 1))
+    chains = []
+    for k in range(num_replicas):
+        chain_rng = random.Random(rng.getrandbits(64))
+        start = Schedule.from_lists(initial if initial is not None else instance.random_schedule(chain_rng))
+        score = instance.evaluate(start)
+        chains.append({
+            'T':          t_min * ratio ** k,
+            'rng':        chain_rng,
+            'current':    start,
+            'counts':     instance.coverage_counts(start),
+            'score':      score,
+            'best':       start.copy(),
+            'best_score': score,
+        })
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    if trace is not None:
+        t = trace.lap('initialization', t)
+    try:
+        done = 0
+        while not stop.should_stop(done, min(c['best_score'] for c in chains)):
+            steps = swap_every if max_iterations is None else min(swap_every, max_iterations - done)
+            if pool is None:
+                chains = [_metropolis(chain, steps, instance) for chain in chains]
+            else:
+                chains = list(pool.map(_metropolis, chains, repeat(steps), repeat(instance)))
+            done += steps
+            if trace is not None:
+                t = trace.lap('metropolis', t)
+
+            # exchange states between neighbouring temperatures (alternate even/odd pairs)
+            for i in range((done // swap_every) % 2, num_replicas - 1, 2):
+                cold, hot = chains[i], chains[i + 1]
+                exponent = (cold['score'] - hot['score']) * (1.0 / cold['T'] - 1.0 / hot['T'])
+                if exponent >= 0 or rng.random() < math.exp(exponent):
+                    for key in ('current', 'counts', 'score'):
+                        cold[key], hot[key] = hot[key], cold[key]
+            if trace is not None:
+                t = trace.lap('exchange', t)
+                if (done // swap_every) % trace.every == 0:
+                    trace.record(done, chains[0]['score'], min(c['best_score'] for c in chains),
+                                 done * num_replicas)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if info is not None:
+        info.update(stop.report())
+    return min(chains, key=lambda c: c['best_score'])['best']
+
+
+def _metropolis(chain, steps, instance):
+    """Advances one replica by `steps` single-cell moves at its fixed temperature."""
+    rng, T = chain['rng'], chain['T']
+    current, counts = chain['current'], chain['counts']
+    curr_score, best_score = chain['score'], chain['best_score']
+
+    for _ in range(steps):
+        nurse     = rng.randint(0, instance.num_nurses - 1)
+        day       = rng.randint(0, instance.num_days - 1)
+        new_shift = rng.choice(instance.shifts)
+        delta     = instance.delta_evaluate(current, nurse, day, new_shift, counts)
+
+        if delta < 0 or rng.random() < math.exp(-delta / T):
+            apply_move(current, nurse, day, new_shift, counts)
+            curr_score += delta
+            if curr_score < best_score:
+                best_score = curr_score
+                chain['best'] = current.copy()
+
+    chain['score'], chain['best_score'] = curr_score, best_score
+    return chain
+
+
+def tweak_schedule(schedule, rng=random, shifts=(0, 1, 2)):
+    """Copying variant of random_move(changing=False): returns a new Schedule."""
+    move = random_move(schedule, rng, shifts, changing=False)
+    new_schedule = Schedule.from_lists(schedule)
+    move.apply(new_schedule)
     return new_schedule
@@ -1,100 +1,343 @@
 # stats_significance.py
 
+import argparse
 import csv
 import math
 from collections import defaultdict
+from functools import lru_cache
 
-def _rank_abs_diffs(diffs):
-    # ranks for absolute diffs with average ranks on ties
-    absvals = [(abs(d), i) for i, d in enumerate(diffs)]
-    absvals.sort(key=lambda x: x[0])
-
-    ranks = [0.0] * len(diffs)
-    r = 1
-    i = 0
-    while i < len(absvals):
-        j = i
-        while j < len(absvals) and absvals[j][0] == absvals[i][0]:
-            j += 1
-        # average rank for ties in [i, j)
-        avg = (r + (r + (j - i) - 1)) / 2.0
-        for _, idx in absvals[i:j]:
-            ranks[idx] = avg
-        r += (j - i)
-        i = j
-    return ranks
+import numpy as np
 
-def wilcoxon_signed_rank(x, y):
-    """
-    Pure-python Wilcoxon signed-rank test (two-sided, normal approximation).
-    Returns p-value.
-    Assumes paired samples x,y same length.
-    Removes zero differences.
-    """
-    diffs = [a - b for a, b in zip(x, y)]
-    # remove zeros
-    nz = [(d, idx) for idx, d in enumerate(diffs) if d != 0]
-    if len(nz) < 5:
-        return 1.0  # too small, be conservative
-
-    diffs_nz = [d for d, _ in nz]
-    ranks = _rank_abs_diffs(diffs_nz)
-
-    w_plus = 0.0
-    w_minus = 0.0
-    for d, rnk in zip(diffs_nz, ranks):
-        if d > 0:
-            w_plus += rnk
-        else:
-            w_minus += rnk
+from utils_results import RESULT_FIELDS, ResultStore
 
-    W = min(w_plus, w_minus)
+EXACT_MAX_N = 50  # exact Wilcoxon null distribution up to this many non-zero differences
 
-    # normal approximation
-    n = len(diffs_nz)
-    mu = n * (n + 1) / 4.0
-    sigma = math.sqrt(n * (n + 1) * (2*n + 1) / 24.0)
-    if sigma == 0:
-        return 1.0
+# Vargha-Delaney |A - 0.5| thresholds (A = 0.56 / 0.64 / 0.71)
+A12_MAGNITUDES = ((0.06, "negligible"), (0.14, "small"), (0.21, "medium"), (math.inf, "large"))
 
-    z = (W - mu) / sigma
-    # two-sided p from normal CDF
-    p = 2.0 * (1.0 - _norm_cdf(abs(z)))
-    return max(0.0, min(1.0, p))
 
 def _norm_cdf(z):
     return 0.5 * (1.0 + math.erf(z / math.sqrt(2.0)))
 
+# Phi on a fine grid, for vectorized lookups (numpy has no erf)
+_PHI_Z = np.linspace(-16.0, 16.0, 32_001)
+_PHI   = np.array([_norm_cdf(z) for z in _PHI_Z])
+
+def _phi(z):
+    return np.interp(z, _PHI_Z, _PHI)
+
+def _rank_rows(a):
+    """Ranks (1-based, ties get the average rank) along the last axis of a 2-D array."""
+    a = np.asarray(a, dtype=float)
+    rows, n = a.shape
+    order = np.argsort(a, axis=1, kind="stable")
+    sorted_a = np.take_along_axis(a, order, axis=1)
+    idx = np.broadcast_to(np.arange(n), (rows, n))
+
+    first = np.ones((rows, n), dtype=bool)   # first position of each tie group
+    first[:, 1:] = sorted_a[:, 1:] != sorted_a[:, :-1]
+    last = np.ones((rows, n), dtype=bool)    # last position of each tie group
+    last[:, :-1] = first[:, 1:]
+    start = np.maximum.accumulate(np.where(first, idx, 0), axis=1)
+    end = np.minimum.accumulate(np.where(last, idx, n - 1)[:, ::-1], axis=1)[:, ::-1]
+
+    ranks = np.empty((rows, n))
+    np.put_along_axis(ranks, order, (start + end) / 2.0 + 1.0, axis=1)
+    return ranks
+
+# ---------------------------------------------------------------------------
+# Wilcoxon signed-rank test
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=4096)
+def _signed_rank_cdf(doubled_ranks):
+    """
+    Exact null CDF of 2 * W+ for the given doubled (hence integer) ranks: every sign
+    pattern is equally likely. Ties are handled exactly since the ranks are the real ones.
+    """
+    counts = np.zeros(sum(doubled_ranks) + 1)
+    counts[0] = 1.0
+    for r in doubled_ranks:
+        shifted = counts.copy()
+        shifted[r:] += counts[:len(counts) - r]
+        counts = shifted
+    return np.cumsum(counts) / 2.0 ** len(doubled_ranks)
+
+def wilcoxon_pairs(diffs, exact_max=EXACT_MAX_N):
+    """
+    Two-sided Wilcoxon signed-rank tests for many paired samples at once.
+    `diffs` is (pairs, runs); zero differences are dropped (Wilcoxon's method).
+    Returns (w_plus, n, p) arrays. The p-value uses the exact null distribution when
+    n <= exact_max and otherwise a tie-corrected normal approximation (with continuity
+    correction). n == 0 gives p = 1.
+    """
+    diffs = np.atleast_2d(np.asarray(diffs, dtype=float))
+    zeros = diffs == 0
+    # zeros take the lowest ranks, so the non-zero ranks are shifted by the zero count
+    ranks = _rank_rows(np.abs(diffs)) - zeros.sum(axis=1, keepdims=True)
+    ranks[zeros] = 0.0
+    n = (~zeros).sum(axis=1)
+    w_plus = (ranks * (diffs > 0)).sum(axis=1)
+
+    p = np.ones(len(diffs))
+    approx = n > exact_max
+    for i in np.flatnonzero((n > 0) & ~approx):
+        doubled = tuple(sorted(int(round(2 * r)) for r in ranks[i][~zeros[i]]))
+        cdf = _signed_rank_cdf(doubled)
+        w2 = int(round(2 * w_plus[i]))
+        lower = cdf[w2]
+        upper = 1.0 - (cdf[w2 - 1] if w2 > 0 else 0.0)
+        p[i] = min(1.0, 2.0 * min(lower, upper))
+
+    if approx.any():
+        mu = (ranks[approx]).sum(axis=1) / 2.0
+        sigma = np.sqrt((ranks[approx] ** 2).sum(axis=1) / 4.0)
+        z = np.maximum(np.abs(w_plus[approx] - mu) - 0.5, 0.0) / sigma
+        p[approx] = np.minimum(1.0, 2.0 * (1.0 - _phi(z)))
+    return w_plus, n, p
+
+def wilcoxon_signed_rank(x, y):
+    """
+    Wilcoxon signed-rank test (two-sided) of paired samples x, y of the same length.
+    Returns the p-value: exact for up to EXACT_MAX_N non-zero differences, normal
+    approximation above. Zero differences are removed.
+    """
+    diffs = np.asarray(x, dtype=float) - np.asarray(y, dtype=float)
+    return float(wilcoxon_pairs(diffs[None, :])[2][0])
+
+# ---------------------------------------------------------------------------
+# Multiple comparisons
+# ---------------------------------------------------------------------------
+
+def holm_adjust(p):
+    """Holm-Bonferroni adjusted p-values for an array of raw p-values."""
+    p = np.asarray(p, dtype=float)
+    m = len(p)
+    order = np.argsort(p, kind="stable")
+    adjusted = np.empty(m)
+    adjusted[order] = np.minimum(1.0, np.maximum.accumulate((m - np.arange(m)) * p[order]))
+    return adjusted
+
 def holm_correction(pvals):
     """
     Holm-Bonferroni correction.
     Input: list of (name, p)
     Output: list of (name, raw_p, holm_p)
     """
-    m = len(pvals)
-    order = sorted(range(m), key=lambda i: pvals[i][1])
-    out = [None] * m
+    adjusted = holm_adjust([p for _, p in pvals])
+    return [(name, p, float(adj)) for (name, p), adj in zip(pvals, adjusted)]
+
+def _chi2_sf(x, df):
+    """Survival function of the chi-square distribution with integer df (closed form)."""
+    if x <= 0:
+        return 1.0
+    half = x / 2.0
+    if df % 2 == 0:
+        terms = [i * math.log(half) - half - math.lgamma(i + 1) for i in range(df // 2)]
+        base = 0.0
+    else:
+        # 2 Q(sqrt x) + 2 phi(sqrt x) * sum x^((2i-1)/2) / (1 * 3 * ... * (2i-1))
+        root = math.sqrt(x)
+        base = 2.0 * (1.0 - _norm_cdf(root))
+        log_phi = -half - 0.5 * math.log(2 * math.pi)
+        terms, log_odd = [], 0.0
+        for i in range(1, (df - 1) // 2 + 1):
+            log_odd += math.log(2 * i - 1)
+            terms.append(math.log(2.0) + log_phi + (2 * i - 1) / 2.0 * math.log(x) - log_odd)
+    if not terms:
+        return min(1.0, base)
+    top = max(terms)
+    return min(1.0, base + math.exp(top) * sum(math.exp(t - top) for t in terms))
 
-    prev = 0.0
-    for k, idx in enumerate(order):
-        name, p = pvals[idx]
-        adj = (m - k) * p
-        if adj < prev:
-            adj = prev
-        prev = adj
-        out[idx] = (name, p, min(1.0, adj))
-    return out
+def friedman_test(scores):
+    """
+    Friedman test on a (k algorithms, N runs) score matrix, runs as blocks and lower
+    scores ranked first. Returns (chi2 statistic, p-value, average ranks); ties within
+    a run get average ranks and the statistic is tie-corrected.
+    """
+    scores = np.asarray(scores, dtype=float)
+    k, N = scores.shape
+    ranks = _rank_rows(scores.T)  # (N, k)
+    rank_sums = ranks.sum(axis=0)
+    numerator = (k - 1) * ((rank_sums - N * (k + 1) / 2.0) ** 2).sum()
+    denominator = (ranks ** 2).sum() - N * k * (k + 1) ** 2 / 4.0
+    stat = numerator / denominator if denominator > 1e-12 else 0.0
+    return float(stat), _chi2_sf(stat, k - 1), rank_sums / N
 
-def load_raw_results(csv_path):
+def studentized_range_cdf(q, k, grid=1601):
+    """
+    P(range of k iid standard normals <= q) (the studentized range with infinite df),
+    by quadrature of k * integral phi(z) [Phi(z) - Phi(z - q)]^(k-1) dz; q may be an array.
+    """
+    q = np.atleast_1d(np.asarray(q, dtype=float))
+    z = np.linspace(-8.0, 8.0, grid)
+    dz = z[1] - z[0]
+    density = np.exp(-z ** 2 / 2.0) / math.sqrt(2 * math.pi)
+    out = np.empty(len(q))
+    step = max(1, 2_000_000 // grid)
+    for s in range(0, len(q), step):
+        inner = _phi(z[None, :]) - _phi(z[None, :] - q[s:s + step, None])
+        out[s:s + step] = k * (density * np.clip(inner, 0.0, 1.0) ** (k - 1)).sum(axis=1) * dz
+    return np.clip(out, 0.0, 1.0)
+
+_RANGE_Q = np.linspace(0.0, 20.0, 4001)
+
+@lru_cache(maxsize=64)
+def _range_cdf_table(k):
+    """studentized_range_cdf tabulated on _RANGE_Q, for interpolation."""
+    return np.maximum.accumulate(studentized_range_cdf(_RANGE_Q, k))
+
+def nemenyi(avg_ranks, N, alpha=0.05):
+    """
+    Nemenyi post-hoc test after Friedman. Returns (critical difference of average
+    ranks at `alpha`, (k, k) matrix of pairwise p-values).
+    """
+    avg_ranks = np.asarray(avg_ranks, dtype=float)
+    k = len(avg_ranks)
+    se = math.sqrt(k * (k + 1) / (6.0 * N))
+    table = _range_cdf_table(k)
+    cd = np.interp(1.0 - alpha, table, _RANGE_Q) / math.sqrt(2.0) * se
+
+    i, j = np.triu_indices(k, 1)
+    q = math.sqrt(2.0) * np.abs(avg_ranks[i] - avg_ranks[j]) / se
+    p = np.ones((k, k))
+    p[i, j] = p[j, i] = 1.0 - np.interp(q, _RANGE_Q, table)
+    return float(cd), p
+
+# ---------------------------------------------------------------------------
+# Effect sizes and confidence intervals
+# ---------------------------------------------------------------------------
+
+def vargha_delaney(scores, block=4_000_000):
+    """
+    Vargha-Delaney A for every pair of rows of a (k, n) score matrix (unpaired):
+    A[i, j] = P(X_i < X_j) + 0.5 P(X_i = X_j), i.e. the probability that a run of i
+    scores better (lower) than one of j. A[i, j] + A[j, i] = 1.
+    """
+    scores = np.asarray(scores, dtype=float)
+    k, n = scores.shape
+    a12 = np.empty((k, k))
+    rows = max(1, block // max(1, k * n * n))
+    for s in range(0, k, rows):
+        x = scores[s:s + rows, None, :, None]
+        y = scores[None, :, None, :]
+        a12[s:s + rows] = ((x < y) + 0.5 * (x == y)).mean(axis=(2, 3))
+    return a12
+
+def a12_magnitude(a12):
+    distance = abs(a12 - 0.5)
+    return next(label for limit, label in A12_MAGNITUDES if distance < limit)
+
+def bootstrap_ci(samples, num_resamples=10_000, alpha=0.05, statistic=np.mean, seed=0,
+                 block=4_000_000):
+    """
+    Percentile bootstrap CI of `statistic` (reducing along an axis) for each row of a
+    (m, n) array; all rows share the resampled run indices. Returns (low, high) arrays.
+    """
+    samples = np.atleast_2d(np.asarray(samples, dtype=float))
+    m, n = samples.shape
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, n, size=(num_resamples, n))
+    low, high = np.empty(m), np.empty(m)
+    rows = max(1, block // max(1, num_resamples * n))
+    if statistic is np.mean:
+        # resampled means as a product with the (resamples, n) draw counts
+        weights = np.zeros((num_resamples, n))
+        np.add.at(weights, (np.arange(num_resamples)[:, None], idx), 1.0 / n)
+        rows = max(1, block // max(1, num_resamples))
+    for s in range(0, m, rows):
+        if statistic is np.mean:
+            stats = samples[s:s + rows] @ weights.T
+        else:
+            stats = statistic(samples[s:s + rows][:, idx], axis=-1)  # (rows, resamples)
+        low[s:s + rows], high[s:s + rows] = np.quantile(stats, [alpha / 2, 1 - alpha / 2], axis=1)
+    return low, high
+
+# ---------------------------------------------------------------------------
+# Whole-table analysis
+# ---------------------------------------------------------------------------
+
+def analyze_size(algomap, alpha=0.05, num_resamples=10_000, exact_max=EXACT_MAX_N, seed=0):
+    """All statistics for one problem size; `algomap` is {algo: scores paired by run}."""
+    return analyze({None: algomap}, alpha, num_resamples, exact_max, seed)[None]
+
+def analyze(data, alpha=0.05, num_resamples=10_000, exact_max=EXACT_MAX_N, seed=0):
+    """
+    {size: statistics} for the nested dict returned by load_raw_results().
+    Sizes with the same number of runs are stacked, so their mean CIs, pairwise
+    Wilcoxon tests and difference CIs each take one vectorized call over every pair
+    of every size; Friedman, Nemenyi, A12 and Holm compare within a size and stay
+    per size.
+    """
+    tables = {}
+    by_runs = defaultdict(list)
+    for size, algomap in data.items():
+        algos = sorted(algomap)
+        scores = np.array([algomap[a] for a in algos], dtype=float)  # (k, N)
+        tables[size] = (algos, scores, np.triu_indices(len(algos), 1))
+        by_runs[scores.shape[1]].append(size)
+
+    results = {}
+    for sizes in by_runs.values():
+        stacked = np.concatenate([tables[size][1] for size in sizes])
+        mean_low, mean_high = bootstrap_ci(stacked, num_resamples, alpha, seed=seed)
+        diffs = np.concatenate([scores[i] - scores[j] for _, scores, (i, j) in
+                                (tables[size] for size in sizes)])
+        if len(diffs):
+            w_plus, n, p = wilcoxon_pairs(diffs, exact_max)
+            diff_low, diff_high = bootstrap_ci(diffs, num_resamples, alpha, seed=seed)
+
+        row = pair = 0
+        for size in sizes:
+            algos, scores, (i, j) = tables[size]
+            k, N = scores.shape
+            rows, pairs = slice(row, row + k), slice(pair, pair + len(i))
+            row, pair = row + k, pair + len(i)
+            result = results[size] = {"algos": algos, "runs": N, "mean": scores.mean(axis=1),
+                                      "mean_ci": (mean_low[rows], mean_high[rows]), "pairs": []}
+            if k < 2:
+                continue
+
+            stat, p_friedman, avg_ranks = friedman_test(scores)
+            cd, p_nemenyi = nemenyi(avg_ranks, N, alpha)
+            result.update(friedman=(stat, p_friedman), avg_ranks=avg_ranks, cd=cd)
+            holm = holm_adjust(p[pairs])
+            a12 = vargha_delaney(scores)
+            for t, (a, b) in enumerate(zip(i, j), start=pairs.start):
+                result["pairs"].append({
+                    "a": algos[a], "b": algos[b], "w_plus": float(w_plus[t]), "n": int(n[t]),
+                    "p": float(p[t]), "holm_p": float(holm[t - pairs.start]),
+                    "nemenyi_p": float(p_nemenyi[a, b]), "a12": float(a12[a, b]),
+                    "effect": a12_magnitude(a12[a, b]), "mean_diff": float(diffs[t].mean()),
+                    "mean_diff_ci": (float(diff_low[t]), float(diff_high[t])),
+                })
+    return {size: results[size] for size in data}
+
+# ---------------------------------------------------------------------------
+# Loading and reporting
+# ---------------------------------------------------------------------------
+
+def load_raw_results(path):
     """
     Returns nested dict:
       data[size][algo] -> list of scores ordered by run_id (paired by run_id)
+    `path` is a results CSV (with or without a header row) or a
+    utils_results.ResultStore database (.db). An algo recorded with several params
+    in one size (a tuning sweep) is split into one entry per params, "algo params".
     """
-    rows = []
-    with open(csv_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            rows.append(r)
+    if path.endswith(".db"):
+        with ResultStore(path) as store:
+            cols = store.columns(["size", "run_id", "algo", "params", "score"])
+        rows = [dict(zip(cols, r)) for r in zip(*cols.values())]
+    else:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            has_header = f.readline().startswith(RESULT_FIELDS[0] + ",")
+            f.seek(0)
+            rows = list(csv.DictReader(f, fieldnames=None if has_header else RESULT_FIELDS))
+
+    params_seen = defaultdict(set)
+    for r in rows:
+        params_seen[(r["size"], r["algo"])].add(r["params"])
 
     # group by size -> run_id -> algo -> score
     tmp = defaultdict(lambda: defaultdict(dict))
@@ -102,6 +345,8 @@ def load_raw_results(csv_path):
         size = r["size"]
         run_id = int(r["run_id"])
         algo = r["algo"]
+        if len(params_seen[(size, algo)]) > 1:
+            algo = f"{algo} {r['params']}"
         score = float(r["score"])
         tmp[size][run_id][algo] = score
 
@@ -124,41 +369,56 @@ def load_raw_results(csv_path):
 
     return data
 
-def run_pairwise_wilcoxon_with_holm(csv_path):
-    data = load_raw_results(csv_path)
-
-    for size, algomap in data.items():
-        algos = sorted(algomap.keys())
-        print(f"\n=== Statistical significance for size: {size} ===")
+def print_report(results, alpha=0.05, all_pairs=False):
+    for size, res in results.items():
+        algos = res["algos"]
+        print(f"\n=== Statistical significance for size: {size} "
+              f"({len(algos)} algorithms, {res['runs']} paired runs) ===")
+        ranks = res.get("avg_ranks")
+        low, high = res["mean_ci"]
+        order = np.argsort(ranks) if ranks is not None else range(len(algos))
+        for t in order:
+            rank = "" if ranks is None else f" | avg rank {ranks[t]:6.2f}"
+            print(f"{algos[t]:30} mean {res['mean'][t]:10.2f} "
+                  f"[{low[t]:.2f}, {high[t]:.2f}]{rank}")
         if len(algos) < 2:
             print("Not enough algorithms to compare.")
             continue
 
-        # pairwise comparisons
-        tests = []
-        for i in range(len(algos)):
-            for j in range(i+1, len(algos)):
-                a, b = algos[i], algos[j]
-                x = algomap[a]
-                y = algomap[b]
-                p = wilcoxon_signed_rank(x, y)
-                tests.append((f"{a} vs {b}", p))
+        stat, p = res["friedman"]
+        print(f"Friedman chi2={stat:.3f}, p={p:.6f} | Nemenyi CD={res['cd']:.3f} (alpha={alpha})")
+
+        pairs = res["pairs"]
+        if not all_pairs and len(algos) > 10:
+            control = algos[int(np.argmin(ranks))]
+            pairs = [pr for pr in pairs if control in (pr["a"], pr["b"])]
+            print(f"(pairs with the best-ranked {control} only; --all-pairs for all)")
+        for pr in sorted(pairs, key=lambda pr: pr["holm_p"]):
+            sig = "SIGNIFICANT" if pr["holm_p"] < alpha else "not significant"
+            lo, hi = pr["mean_diff_ci"]
+            print(f"{pr['a'] + ' vs ' + pr['b']:30} raw p={pr['p']:.6f} | Holm p={pr['holm_p']:.6f}"
+                  f" | Nemenyi p={pr['nemenyi_p']:.4f} | A={pr['a12']:.3f} ({pr['effect']})"
+                  f" | diff {pr['mean_diff']:.1f} [{lo:.1f}, {hi:.1f}] => {sig}")
 
-        corrected = holm_correction(tests)
+def run_pairwise_wilcoxon_with_holm(path, alpha=0.05, num_resamples=10_000, all_pairs=False):
+    results = analyze(load_raw_results(path), alpha, num_resamples)
+    print_report(results, alpha, all_pairs)
+    return results
 
-        # print nicely
-        for name, raw_p, holm_p in sorted(corrected, key=lambda t: t[2]):
-            sig = "SIGNIFICANT" if holm_p < 0.05 else "not significant"
-            print(f"{name:30} raw p={raw_p:.6f} | Holm p={holm_p:.6f} => {sig}")
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pairwise Wilcoxon (Holm), Friedman/Nemenyi, Vargha-Delaney A and "
+                    "bootstrap CIs for every problem size of a results file.")
+    parser.add_argument("path", help="results CSV or ResultStore .db")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--bootstrap", type=int, default=10_000, help="bootstrap resamples")
+    parser.add_argument("--all-pairs", action="store_true",
+                        help="print every pair even with more than 10 algorithms")
+    cli = parser.parse_args()
+    run_pairwise_wilcoxon_with_holm(cli.path, cli.alpha, cli.bootstrap, cli.all_pairs)
 
 
 if __name__ == "__main__":
     # Example:
-    # python stats_significance.py results/tuned_raw.csv
-    import sys
-    if len(sys.argv) != 2:
-        print("Usage: python stats_significance.py <csv_path>")
-        raise SystemExit(1)
-
-
-    run_pairwise_wilcoxon_with_holm(sys.argv[1])
+    # python stats_significance.py results/tuned_raw.db   (or a results CSV)
+    main()
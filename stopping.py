@@ -0,0 +1,64 @@
+# stopping.py
+
+import time
+
+
+class StopCriteria:
+    """
+    Stopping rule shared by the run_* solvers. A run ends at the first of:
+      'target'         - best score <= target_score
+      'max_iterations' - max_iterations iterations/generations done (None = no cap)
+      'stall'          - stall_iterations iterations without a new best
+      'time_budget'    - time_budget seconds of wall clock elapsed
+    The clock is only read every `check_every` iterations to keep hot loops cheap.
+    """
+    __slots__ = ("max_iterations", "target_score", "stall_iterations", "check_every",
+                 "start", "deadline", "best_score", "last_improvement", "iterations", "reason")
+
+    def __init__(self, max_iterations=None, *, time_budget=None, target_score=None,
+                 stall_iterations=None, check_every=1):
+        if max_iterations is None and time_budget is None and stall_iterations is None \
+                and target_score is None:
+            raise ValueError("at least one stopping criterion is required")
+        self.max_iterations   = max_iterations
+        self.target_score     = target_score
+        self.stall_iterations = stall_iterations
+        self.check_every      = max(1, check_every)
+        self.start            = time.perf_counter()
+        self.deadline         = None if time_budget is None else self.start + time_budget
+        self.best_score       = float('inf')
+        self.last_improvement = 0
+        self.iterations       = 0
+        self.reason           = None
+
+    def should_stop(self, k, best_score):
+        """Called before iteration k (= iterations completed so far) with the best score."""
+        self.iterations = k
+        if best_score < self.best_score:
+            self.best_score = best_score
+            self.last_improvement = k
+
+        if self.target_score is not None and best_score <= self.target_score:
+            self.reason = 'target'
+        elif self.max_iterations is not None and k >= self.max_iterations:
+            self.reason = 'max_iterations'
+        elif self.stall_iterations is not None and k - self.last_improvement >= self.stall_iterations:
+            self.reason = 'stall'
+        elif (self.deadline is not None and k % self.check_every == 0
+              and time.perf_counter() >= self.deadline):
+            self.reason = 'time_budget'
+        return self.reason is not None
+
+    def remaining(self):
+        """Seconds left in the time budget (None without one)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def report(self):
+        return {
+            'stop_reason': self.reason,
+            'iterations':  self.iterations,
+            'elapsed_s':   time.perf_counter() - self.start,
+            'best_score':  self.best_score,
+        }
@@ -1,73 +1,245 @@
 import random
-from problem import create_random_schedule, evaluate
+import numpy as np
+from moves import OperatorSelector
+from neighborhood import NO_MOVE, DeltaTable
+from problem import Move, Schedule, current_instance, random_move
+from stopping import StopCriteria
+
+NEIGHBORHOODS = ('sampled', 'full', 'candidates')
 
 def run_tabu_search(
     *,
+    instance          = None,
     max_iterations    = 2_000,
     tabu_tenure       = 10,
     neighborhood_size = 20,
+    neighborhood      = 'sampled',
+    operators         = None,
+    reactive          = False,
+    max_tenure        = None,
+    time_budget       = None,
+    target_score      = None,
+    stall_iterations  = None,
+    info              = None,
+    trace             = None,
+    initial           = None,
     seed              = None
 ):
+    """
+    Tabu search over single-cell moves; returns the best Schedule found.
+    neighborhood='sampled' draws `neighborhood_size` random moves per iteration;
+    'full' takes the best move of the whole one-cell neighbourhood from a DeltaTable,
+    and 'candidates' restricts that to cells in a hard violation (all cells once
+    there are none).
+    `operators` (names from moves.OPERATORS, sampled neighbourhood only) draws the
+    candidates as compound moves chosen by a moves.OperatorSelector; a move is tabu
+    if any of its cells is.
+    Tabu status is kept in a (nurses, days) array of expiry iterations. reactive=True
+    Zobrist-hashes every visited schedule: a revisit grows the tenure (up to
+    max_tenure, default nurses * days // 4), and it shrinks back towards tabu_tenure
+    after a stretch without revisits longer than the average cycle. Hashes unseen for
+    4 * max_tenure iterations are forgotten, which keeps memory bounded; `info` then
+    also gets 'revisits' and the final 'tabu_tenure'.
+    `initial` (Schedule or list rows) replaces the random start.
+    `instance` is the ProblemInstance to solve (defaults to the problem module globals).
+    Stops at max_iterations (None = no cap), or earlier on time_budget (seconds),
+    target_score or stall_iterations; `info` receives the StopCriteria report.
+    A tracing.Trace passed as `trace` is sampled every trace.every iterations
+    (evaluations = moves scored so far: neighborhood_size per sampled iteration,
+    or the (nurses + days) * shifts table entries rescored per move) and times the
+    'initialization', 'neighborhood' and 'move' phases.
+    """
+    if neighborhood not in NEIGHBORHOODS:
+        raise ValueError(f"neighborhood must be one of {NEIGHBORHOODS}")
+    if operators and neighborhood != 'sampled':
+        raise ValueError("operators need neighborhood='sampled'")
+    instance = instance or current_instance()
+    if trace is not None:
+        t = trace.begin()
+    rng = random.Random(seed)
+    stop = StopCriteria(max_iterations, time_budget=time_budget, target_score=target_score,
+                        stall_iterations=stall_iterations, check_every=16)
 
-    if seed is not None:
-        random.seed(seed)
-
-    current = create_random_schedule()
-    curr_score = evaluate(current)
+    current = Schedule.from_lists(initial if initial is not None else instance.random_schedule(rng))
+    curr_score = instance.evaluate(current)
+    counts = instance.coverage_counts(current)
 
-    best = [row[:] for row in current]
+    best = current.copy()
     best_score = curr_score
 
-    tabu_list = {}
+    tabu_until = np.zeros((instance.num_nurses, instance.num_days), dtype=np.int64)
+    if reactive:
+        zobrist = ZobristHash(instance, current, seed)
+        visited = {zobrist.value: 0}
+        max_tenure = max_tenure or max(tabu_tenure, instance.num_nurses * instance.num_days // 4)
+        memory = 4 * max_tenure  # states unvisited for this many iterations are forgotten
+        min_tenure = tabu_tenure
+        revisits, last_change, mean_cycle = 0, 0, float(tabu_tenure)
+    table = None if neighborhood == 'sampled' else DeltaTable(instance, current, counts)
+    selector = OperatorSelector(operators) if operators else None
+    if trace is not None:
+        per_iteration = (neighborhood_size if table is None else
+                         (instance.num_nurses + instance.num_days) * len(instance.shifts))
+        t = trace.lap('initialization', t)
+
+    k = 0
+    while not stop.should_stop(k, best_score):
 
-    for k in range(max_iterations):
-        
-        local_best_candidate = None
+        # candidates are (move, score) pairs on the working schedule; nothing is copied
+        local_best_move = None
         local_best_score = float('inf')
-        local_best_move = None  # Stores (nurse, day)
-
-        for _ in range(neighborhood_size):
-            candidate, move = tweak_schedule_with_move_info(current)
-            score = evaluate(candidate)
-            
-            is_tabu = (move in tabu_list and tabu_list[move] > k)
-            
-            is_aspiration = (score < best_score)
-
-            if (not is_tabu) or is_aspiration:
-                if score < local_best_score:
-                    local_best_candidate = candidate
-                    local_best_score = score
-                    local_best_move = move
-
-        if local_best_candidate is not None:
-            current = local_best_candidate
+
+        if table is not None:
+            allowed = None
+            if neighborhood == 'candidates':
+                allowed = table.violating()
+                if not allowed.any():
+                    allowed = None
+            local_best_move, local_best_score = _best_table_move(
+                table, curr_score, best_score, tabu_until, k, allowed, rng)
+        elif selector is not None:
+            for _ in range(neighborhood_size):
+                op, move, delta = selector.propose(instance, current, counts, rng, instance.shifts)
+                selector.update(op, delta < 0)
+                if not move.changes:
+                    continue
+                score = curr_score + delta
+
+                is_tabu = any(tabu_until[change.nurse, change.day] > k for change in move.changes)
+
+                if (not is_tabu) or score < best_score:
+                    if score < local_best_score:
+                        local_best_score = score
+                        local_best_move = move
+        else:
+            for _ in range(neighborhood_size):
+                move = random_move(current, rng, instance.shifts)
+                score = curr_score + move.delta(instance, current, counts)
+
+                is_tabu = tabu_until[move.nurse, move.day] > k
+
+                is_aspiration = (score < best_score)
+
+                if (not is_tabu) or is_aspiration:
+                    if score < local_best_score:
+                        local_best_score = score
+                        local_best_move = move
+
+        if trace is not None:
+            t = trace.lap('neighborhood', t)
+
+        if local_best_move is not None:
+            if table is None:
+                local_best_move.apply(current, counts)
+            else:
+                table.apply(local_best_move.nurse, local_best_move.day, local_best_move.new)
             curr_score = local_best_score
-            
-            tabu_list[local_best_move] = k + tabu_tenure
 
+            changes = local_best_move.changes if selector is not None else (local_best_move,)
+            for change in changes:
+                tabu_until[change.nurse, change.day] = k + tabu_tenure
+
+            if reactive:
+                for change in changes:
+                    zobrist.update(*change)
+                last_visit = visited.pop(zobrist.value, None)
+                if last_visit is not None:
+                    # cycling: lengthen the tabu tenure
+                    revisits += 1
+                    mean_cycle += 0.1 * (k + 1 - last_visit - mean_cycle)
+                    tabu_tenure = min(max_tenure, int(tabu_tenure * 1.1) + 1)
+                    last_change = k
+                elif k - last_change > mean_cycle:
+                    tabu_tenure = max(min_tenure, int(tabu_tenure * 0.9))
+                    last_change = k
+                visited[zobrist.value] = k + 1
+                # the dict is in last-visit order: drop the stale head
+                oldest = next(iter(visited))
+                while visited[oldest] < k + 1 - memory:
+                    del visited[oldest]
+                    oldest = next(iter(visited))
+
+            # the best-so-far copy is only materialized on improvement
             if curr_score < best_score:
                 best_score = curr_score
-                best = [row[:] for row in current]
-        
-        if k % 100 == 0:
-            tabu_list = {m: exp for m, exp in tabu_list.items() if exp > k}
+                best = current.copy()
+
+        if trace is not None:
+            t = trace.lap('move', t)
+            if k % trace.every == 0:
+                trace.record(k, curr_score, best_score, (k + 1) * per_iteration)
+        k += 1
 
+    if info is not None:
+        info.update(stop.report())
+        if selector is not None:
+            info['operators'] = selector.report()
+        if reactive:
+            info['revisits'] = revisits
+            info['tabu_tenure'] = tabu_tenure
     return best
 
 
-def tweak_schedule_with_move_info(schedule):
-
-    new_schedule = [row[:] for row in schedule]
-    
-    nurse_idx = random.randint(0, len(new_schedule) - 1)
-    day_idx   = random.randint(0, len(new_schedule[0]) - 1)
-    
-    # Ensure we actually change the shift (avoid 0->0 move)
-    current_shift = new_schedule[nurse_idx][day_idx]
-    possible_shifts = [s for s in [0, 1, 2] if s != current_shift]
-    
-    new_shift = random.choice(possible_shifts)
-    new_schedule[nurse_idx][day_idx] = new_shift
-    
-    return new_schedule, (nurse_idx, day_idx)
\ No newline at end of file
+def _best_table_move(table, curr_score, best_score, tabu_until, k, allowed, rng):
+    """
+    Best admissible move of a DeltaTable as (Move, score), or (None, inf) if every move
+    is tabu. Tabu cells stay admissible when they beat best_score (aspiration);
+    ties are broken at random.
+    """
+    num_days = table.table.shape[1]
+    flat = table.table.reshape(-1, table.table.shape[2])
+    tabu = tabu_until.reshape(-1) > k
+    if allowed is None:
+        cells = None
+        deltas = flat
+    else:
+        cells = np.flatnonzero(allowed)
+        deltas = flat[cells]
+        tabu = tabu[cells]
+
+    if tabu.any():
+        deltas = np.where(tabu[:, None] & (deltas >= best_score - curr_score), NO_MOVE, deltas)
+
+    best_delta = deltas.min()
+    if best_delta == NO_MOVE:
+        return None, float('inf')
+    ties = np.flatnonzero(deltas == best_delta)
+    index = ties[rng.randrange(len(ties))] if len(ties) > 1 else ties[0]
+    row, new_shift = divmod(int(index), deltas.shape[1])
+    if cells is not None:
+        row = int(cells[row])
+    nurse, day = divmod(row, num_days)
+    move = Move(nurse, day, table.schedule[nurse, day], new_shift)
+    return move, curr_score + int(best_delta)
+
+
+class ZobristHash:
+    """
+    Zobrist hash of a schedule: the XOR of one random 64-bit key per (nurse, day, shift)
+    cell value, updated in O(1) per changed cell.
+    """
+    __slots__ = ("keys", "num_days", "value")
+
+    def __init__(self, instance, schedule, seed=None):
+        rng = np.random.default_rng(seed)
+        self.num_days = instance.num_days
+        # one key per cell and shift slot; the trailing slot is OFF_SHIFT (-1 wraps to it)
+        self.keys = rng.integers(0, np.iinfo(np.uint64).max, endpoint=True, dtype=np.uint64,
+                                 size=(instance.num_nurses * instance.num_days,
+                                       len(instance.shifts) + 1)).tolist()
+        self.value = 0
+        for nurse in range(instance.num_nurses):
+            for day in range(instance.num_days):
+                self.value ^= self.keys[nurse * self.num_days + day][schedule[nurse, day]]
+
+    def update(self, nurse, day, old, new):
+        keys = self.keys[nurse * self.num_days + day]
+        self.value ^= keys[old] ^ keys[new]
+
+
+def tweak_schedule_with_move_info(schedule, rng=random, shifts=(0, 1, 2)):
+    """Copying variant of random_move: returns (new Schedule, (nurse, day))."""
+    move = random_move(schedule, rng, shifts)
+    new_schedule = Schedule.from_lists(schedule)
+    move.apply(new_schedule)
+    return new_schedule, (move.nurse, move.day)
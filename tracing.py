@@ -0,0 +1,55 @@
+# tracing.py
+
+import time
+from collections import deque
+
+TRACE_FIELDS = ("iteration", "elapsed_s", "current", "best", "evaluations")
+
+
+class Trace:
+    """
+    Optional instrumentation for the run_* solvers (pass as trace=). Keeps a ring buffer
+    of the last `capacity` samples (iteration, elapsed_s, current, best, evaluations),
+    taken every `every` iterations/generations, and accumulates wall time per named
+    phase. `callback(sample)` is also called for each sample. Solvers only touch it
+    behind `trace is not None` checks, so a run without one pays nothing.
+    """
+    __slots__ = ("every", "callback", "samples", "phases", "start")
+
+    def __init__(self, every=1, capacity=100_000, callback=None):
+        self.every    = max(1, every)
+        self.callback = callback
+        self.samples  = deque(maxlen=capacity)
+        self.phases   = {}
+        self.start    = time.perf_counter()
+
+    def begin(self):
+        """Restarts the clock (solvers call this on entry); returns the time for lap()."""
+        self.start = time.perf_counter()
+        return self.start
+
+    def record(self, iteration, current, best, evaluations):
+        sample = (iteration, time.perf_counter() - self.start, current, best, evaluations)
+        self.samples.append(sample)
+        if self.callback is not None:
+            self.callback(sample)
+
+    def lap(self, phase, since):
+        """Adds the time since `since` to `phase`; returns now, to chain the next lap."""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - since
+        return now
+
+    def converged_at(self, tolerance=0):
+        """First sample whose best is within `tolerance` of the final best (None if empty)."""
+        if not self.samples:
+            return None
+        final = self.samples[-1][3]
+        return next(sample for sample in self.samples if sample[3] <= final + tolerance)
+
+    def to_dict(self):
+        return {
+            "fields":   list(TRACE_FIELDS),
+            "samples":  [list(sample) for sample in self.samples],
+            "phases_s": {phase: round(seconds, 6) for phase, seconds in self.phases.items()},
+        }
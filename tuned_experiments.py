@@ -1,13 +1,12 @@
 # tuned_experiments.py
 
-import time, statistics
-import random
-import problem
+import argparse, os, statistics
 import matplotlib.pyplot as plt
 
 from simulated_annealing import run_simulated_annealing
 from ant_colony       import run_ant_colony
-from utils_results    import append_row, json_params
+from runner           import build_jobs, run_jobs, group_results, print_row
+from utils_results    import ResultStore
 
 NUM_RUNS = 10
 BASE_SEED = 12345
@@ -42,7 +41,8 @@ experiments = [
             'num_iterations': 200,
             'evaporation':    0.9,
             'alpha':          1.0,
-            'beta':           2.0
+            'beta':           2.0,
+            'heuristic':      True
         }
     },
 ]
@@ -54,87 +54,74 @@ problem_sizes = [
     ("Large",  50, 30),
 ]
 
-RAW_CSV = "results/tuned_raw.csv"
-
-for size_label, nurses, days in problem_sizes:
-    problem.NUM_NURSES = nurses
-    problem.NUM_DAYS   = days
-
-    print(f"\n===== {size_label} ({nurses}×{days}) =====")
-
-    results = {exp['label']:{'scores':[], 'times':[]} for exp in experiments}
-
-    for run in range(1, NUM_RUNS+1):
-        seed = BASE_SEED + run
-
-        print(f"\n--- Run {run} (seed={seed}) ---")
-
-        # also seed the global RNG used by problem.create_random_schedule etc.
-        random.seed(seed)
-
-        for exp in experiments:
-            lbl, fn, args = exp['label'], exp['func'], exp['args']
-
-            # pass seed down to algorithms (works because we added seed param)
-            run_args = dict(args)
-            run_args["seed"] = seed
-
-            t0 = time.time()
-            schedule = fn(**run_args)
-            score    = problem.evaluate(schedule)
-            dt       = round(time.time() - t0, 4)
-
-            results[lbl]['scores'].append(score)
-            results[lbl]['times'].append(dt)
-
-            append_row(RAW_CSV, {
-                "size": size_label,
-                "nurses": nurses,
-                "days": days,
-                "run_id": run,
-                "seed": seed,
-                "algo": lbl,
-                "params": json_params(args),
-                "score": score,
-                "runtime_s": dt
-            })
-
-            print(f"{lbl:10} → Score: {score:8} | Time: {dt:8.4f}s")
-
-    # summary
-    print("\n--- Summary ---")
-    for lbl, data in results.items():
-        sc, tm = data['scores'], data['times']
-        print(f"{lbl:10} | "
-              f"Score → μ={statistics.mean(sc):.2f}, σ={statistics.pstdev(sc):.2f}, "
-              f"median={statistics.median(sc):.2f}, [{min(sc)}, {max(sc)}] | "
-              f"Time  → μ={statistics.mean(tm):.4f}s, σ={statistics.pstdev(tm):.4f}s, "
-              f"[{min(tm):.4f}s, {max(tm):.4f}s]")
-
-    # plots (same style as you had)
-    labels      = list(results.keys())
-    mean_scores = [statistics.mean(results[l]['scores']) for l in labels]
-    mean_times  = [statistics.mean(results[l]['times'])  for l in labels]
-    x           = range(len(labels))
-
-    plt.figure()
-    plt.bar(x, mean_scores)
-    plt.xticks(x, labels, rotation=45)
-    plt.ylabel('Mean Penalty Score')
-    plt.title(f'{size_label}: Mean Score')
-    plt.tight_layout()
-    plt.savefig(f'{size_label}_tuned_mean_score.png')
-    plt.close()
-
-    plt.figure()
-    plt.bar(x, mean_times)
-    plt.xticks(x, labels, rotation=45)
-    plt.ylabel('Mean Runtime (s)')
-    plt.title(f'{size_label}: Mean Time')
-    plt.tight_layout()
-    plt.savefig(f'{size_label}_tuned_mean_time.png')
-    plt.close()
-
-print(f"\nRaw results saved to: {RAW_CSV}")
-print("Next: run statistical significance test:")
-print("  python stats_significance.py results/tuned_raw.csv")
+RAW_DB  = "results/tuned_raw.db"
+RAW_CSV = "results/tuned_raw.csv"  # CSV export of RAW_DB
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: all cores, 1 = serial)")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"skip runs already recorded in {RAW_DB}")
+    parser.add_argument("--trace", metavar="PATH", default=None,
+                        help="append a convergence trace per run to PATH (JSON lines)")
+    parser.add_argument("--trace-every", type=int, default=100,
+                        help="trace sampling interval in iterations/generations")
+    cli = parser.parse_args()
+
+    with ResultStore(RAW_DB) as store:
+        # RAW_CSV is rewritten from the store below: carry its rows over first
+        if not len(store) and os.path.isfile(RAW_CSV):
+            print(f"Importing {store.import_csv(RAW_CSV)} rows from {RAW_CSV}")
+        jobs = build_jobs(experiments, problem_sizes, NUM_RUNS, BASE_SEED)
+        rows = run_jobs(jobs, store=store, workers=cli.workers, on_row=print_row,
+                        resume=cli.resume, trace_path=cli.trace, trace_every=cli.trace_every)
+        store.export_csv(RAW_CSV)
+    grouped = group_results(rows)
+
+    for size_label, nurses, days in problem_sizes:
+        print(f"\n===== {size_label} ({nurses}×{days}) =====")
+
+        results = grouped[size_label]
+
+        # summary
+        print("\n--- Summary ---")
+        for lbl, data in results.items():
+            sc, tm = data['scores'], data['times']
+            print(f"{lbl:10} | "
+                  f"Score → μ={statistics.mean(sc):.2f}, σ={statistics.pstdev(sc):.2f}, "
+                  f"median={statistics.median(sc):.2f}, [{min(sc)}, {max(sc)}] | "
+                  f"Time  → μ={statistics.mean(tm):.4f}s, σ={statistics.pstdev(tm):.4f}s, "
+                  f"[{min(tm):.4f}s, {max(tm):.4f}s]")
+
+        # plots (same style as you had)
+        labels      = list(results.keys())
+        mean_scores = [statistics.mean(results[l]['scores']) for l in labels]
+        mean_times  = [statistics.mean(results[l]['times'])  for l in labels]
+        x           = range(len(labels))
+
+        plt.figure()
+        plt.bar(x, mean_scores)
+        plt.xticks(x, labels, rotation=45)
+        plt.ylabel('Mean Penalty Score')
+        plt.title(f'{size_label}: Mean Score')
+        plt.tight_layout()
+        plt.savefig(f'{size_label}_tuned_mean_score.png')
+        plt.close()
+
+        plt.figure()
+        plt.bar(x, mean_times)
+        plt.xticks(x, labels, rotation=45)
+        plt.ylabel('Mean Runtime (s)')
+        plt.title(f'{size_label}: Mean Time')
+        plt.tight_layout()
+        plt.savefig(f'{size_label}_tuned_mean_time.png')
+        plt.close()
+
+    print(f"\nRaw results saved to: {RAW_DB} (CSV export: {RAW_CSV})")
+    print("Next: run statistical significance test:")
+    print(f"  python stats_significance.py {RAW_DB}")
+
+
+if __name__ == "__main__":
+    main()
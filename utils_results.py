@@ -1,6 +1,9 @@
 # utils_results.py
 
-import csv, os, json
+import csv, os, json, sqlite3
+
+# Column order written by the experiment runners (used for header-less CSVs)
+RESULT_FIELDS = ["size", "nurses", "days", "run_id", "seed", "algo", "params", "score", "runtime_s"]
 
 def json_params(d: dict) -> str:
     return json.dumps(d, sort_keys=True)
@@ -16,3 +19,166 @@ def append_row(csv_path: str, row: dict) -> None:
         if not file_exists:
             writer.writeheader()
         writer.writerow(row)
+
+def append_trace(path: str, row: dict, trace: dict) -> None:
+    """Appends one run's trace (tracing.Trace.to_dict()) as a JSON line tagged with its row."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    record = {k: row[k] for k in ("size", "algo", "params", "seed", "run_id", "score", "runtime_s")}
+    record.update(trace)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+def result_key(size, algo, params: str, seed) -> tuple:
+    """Identity of one run in the results CSV: (size, algo, params JSON, seed)."""
+    return (str(size), str(algo), params, "" if seed is None or seed == "" else str(seed))
+
+def _number(text: str):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def _read_rows(csv_path: str):
+    """Yields the typed rows of a results CSV (header-less files use RESULT_FIELDS)."""
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        has_header = f.readline().startswith(RESULT_FIELDS[0] + ",")
+        f.seek(0)
+        for r in csv.DictReader(f, fieldnames=None if has_header else RESULT_FIELDS):
+            row = dict(r)
+            for col in ("nurses", "days", "run_id"):
+                row[col] = int(row[col])
+            row["seed"] = int(row["seed"]) if row["seed"] else None
+            row["score"] = _number(row["score"])
+            row["runtime_s"] = float(row["runtime_s"])
+            yield row
+
+def load_recorded(csv_path: str) -> dict:
+    """
+    Indexes an existing results CSV by result_key -> typed row.
+    Returns {} when the file does not exist; the first row wins on duplicates.
+    Files without a header row are read with the RESULT_FIELDS column order.
+    """
+    recorded = {}
+    if not os.path.isfile(csv_path):
+        return recorded
+    for row in _read_rows(csv_path):
+        key = result_key(row["size"], row["algo"], row["params"], row["seed"])
+        recorded.setdefault(key, row)
+    return recorded
+
+# Column types of the SQLite results store (same order as RESULT_FIELDS)
+_STORE_TYPES = {"size": "TEXT", "nurses": "INTEGER", "days": "INTEGER", "run_id": "INTEGER",
+                "seed": "INTEGER", "algo": "TEXT", "params": "TEXT", "score": "NUMERIC",
+                "runtime_s": "REAL"}
+
+
+class ResultStore:
+    """
+    Results table in a SQLite file: typed columns, an index on the result_key columns
+    and one on algo. append() buffers rows and writes them in one transaction every
+    `batch_size` rows (and on flush()/close()); use it as a context manager so the
+    tail of the buffer is not lost. select()/columns() filter on size, algo and params
+    in SQL; export_csv() writes the classic results CSV.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer = []
+        self._conn = sqlite3.connect(path)
+        cols = ", ".join(f"{name} {_STORE_TYPES[name]}" for name in RESULT_FIELDS)
+        with self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS results ({cols})")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_key "
+                               "ON results (size, algo, params, seed)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_algo ON results (algo)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        self.flush()
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def append(self, row: dict) -> None:
+        self._buffer.append(tuple(row[name] for name in RESULT_FIELDS))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def extend(self, rows) -> None:
+        for row in rows:
+            self.append(row)
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        marks = ", ".join("?" * len(RESULT_FIELDS))
+        with self._conn:
+            self._conn.executemany(f"INSERT INTO results VALUES ({marks})", self._buffer)
+        self._buffer = []
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+    def _query(self, fields, size, algo, params):
+        where, args = [], []
+        for name, value in (("size", size), ("algo", algo), ("params", params)):
+            if value is not None:
+                where.append(f"{name} = ?")
+                args.append(str(value))
+        sql = f"SELECT {', '.join(fields)} FROM results"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        self.flush()
+        return self._conn.execute(sql + " ORDER BY rowid", args)
+
+    def select(self, size=None, algo=None, params=None) -> list:
+        """Typed rows (dicts in RESULT_FIELDS order), in insertion order."""
+        return [dict(zip(RESULT_FIELDS, r))
+                for r in self._query(RESULT_FIELDS, size, algo, params)]
+
+    def columns(self, fields=RESULT_FIELDS, size=None, algo=None, params=None) -> dict:
+        """{field: list of values} for the matching rows, in insertion order."""
+        fields = list(fields)
+        values = list(zip(*self._query(fields, size, algo, params))) or [()] * len(fields)
+        return {name: list(col) for name, col in zip(fields, values)}
+
+    def recorded(self) -> dict:
+        """Same index as load_recorded(): result_key -> row, first row winning."""
+        recorded = {}
+        for row in self.select():
+            recorded.setdefault(result_key(row["size"], row["algo"], row["params"], row["seed"]), row)
+        return recorded
+
+    def export_csv(self, csv_path: str) -> int:
+        """Writes every row to `csv_path` (with header, overwriting it); returns the row count."""
+        folder = os.path.dirname(csv_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        count = 0
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(RESULT_FIELDS)
+            for r in self._query(RESULT_FIELDS, None, None, None):
+                writer.writerow("" if v is None else v for v in r)
+                count += 1
+        return count
+
+    def import_csv(self, csv_path: str) -> int:
+        """Appends every row of a results CSV (duplicates included); returns how many."""
+        count = 0
+        for row in _read_rows(csv_path):
+            self.append(row)
+            count += 1
+        self.flush()
+        return count